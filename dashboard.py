@@ -1,12 +1,169 @@
+import time
+_import_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import sqlite3
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+import db_pool
+import hll
+import live
+import perf
+import rollups
+import snapshot
+from data_cache import FRAME_CACHE, VIEW_CACHE, db_fingerprint, start_warmup
+
+# Plotly e DuckDB ficam fora daqui: são importados no primeiro gráfico desenhado (plotly_modules)
+# e na primeira consulta do motor duckdb (load_duckdb). Tempo das importações desta execução:
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+# Filtros da barra lateral, na ordem usada nas chaves de cache
+FILTERS = ('data_inicio', 'data_fim', 'cidade', 'categoria')
+
+# Origem dos KPIs e gráficos: 'rollup' (tabela rollup_diario), 'duckdb' (SQL colunar sobre
+# o snapshot Parquet ou a própria base SQLite) ou 'pandas' (agregação do DataFrame de pedidos).
+# Se o motor escolhido não estiver disponível, o dashboard usa o pandas
+DASHBOARD_ENGINE = os.environ.get('IFOOD_DASHBOARD_ENGINE', 'rollup')
+
+# Contagens distintas de usuários e restaurantes: 'exact' (COUNT DISTINCT / pd.unique) ou 'hll'
+# (união dos sketches HyperLogLog de rollup_sketch, em qualquer motor)
+DISTINCT_COUNTS = os.environ.get('IFOOD_DISTINCT_COUNTS', 'exact')
+
+# Intervalo padrão (segundos) entre consultas de pedidos novos no modo ao vivo (mínimo de 1s, o do controle da barra lateral)
+LIVE_INTERVAL = max(1.0, float(os.environ.get('IFOOD_LIVE_INTERVAL', '5')))
+
+# Colunas do DataFrame de pedidos (nome: expressão SQL sobre os aliases de _from_clause)
+ORDER_COLUMNS = {
+    'id': 'p.id',
+    'restaurante_id': 'p.restaurante_id',
+    'usuario_id': 'p.usuario_id',
+    'valor_pedido': 'p.valor_pedido',
+    'tempo_entrega': 'p.tempo_entrega',
+    'avaliacao': 'p.avaliacao',
+    'data_pedido': 'p.data_pedido',
+    'status': 'p.status',
+    'categoria': 'r.categoria',
+    'cidade': 'r.cidade',
+    'usuario_segmento': 'u.segmento'
+}
+ORDER_COLUMNS_ANALYTICS = {**ORDER_COLUMNS, 'status': 's.nome', 'categoria': 'c.nome', 'cidade': 'd.nome'}
+
+# Tipos compactos: poucas categorias distintas, ids e minutos inteiros, notas de 1 a 5.
+# valor_pedido continua float64 para que somas de receita não percam centavos
+CATEGORY_COLUMNS = ('status', 'categoria', 'cidade', 'usuario_segmento')
+INTEGER_COLUMNS = ('id', 'restaurante_id', 'usuario_id', 'tempo_entrega')
+FLOAT32_COLUMNS = ('avaliacao',)
+
+# Granularidades do gráfico de evolução e limite de pontos enviados ao navegador por série
+GRANULARITIES = ('Diária', 'Semanal', 'Mensal')
+MAX_CHART_POINTS = int(os.environ.get('IFOOD_MAX_CHART_POINTS', '400'))
+
+# Seções da página, montadas só quando abertas: tabela de origem na visão e método que desenha a figura
+SECTIONS = {
+    'receita': ('diario', 'create_revenue_chart'),
+    'categoria': ('categoria', 'create_category_performance'),
+    'cidade': ('cidade', 'create_city_analysis'),
+    'segmento': ('segmento', 'create_user_segmentation')
+}
+
+# Com 1, a primeira execução do script em cada processo (e após cada mudança na base) aquece em
+# segundo plano o que a primeira visita usa: Plotly, opções de filtro, visão padrão e gráfico de receita
+WARMUP = os.environ.get('IFOOD_WARMUP') == '1'
+
+# Threads usadas para as consultas independentes de uma visão (consultas SQLite e NumPy liberam o GIL)
+RENDER_WORKERS = int(os.environ.get('IFOOD_RENDER_WORKERS', '4'))
+
+@functools.lru_cache(maxsize=None)
+def plotly_modules():
+    """plotly.express, plotly.graph_objects e make_subplots, importados quando o primeiro gráfico é desenhado"""
+    with perf.stage('import plotly'):
+        import plotly.express as px
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+    return px, go, make_subplots
+
+@functools.lru_cache(maxsize=None)
+def load_duckdb():
+    """Módulo duckdb, importado na primeira consulta do motor duckdb (None se não estiver instalado)"""
+    try:
+        import duckdb
+    except ImportError:
+        return None
+    return duckdb
+
+@functools.lru_cache(maxsize=None)
+def duckdb_sqlite_available():
+    """Verdadeiro se a extensão sqlite do DuckDB carrega. Sem ela instalada, o download é tentado
+    uma única vez por processo: sem rede, o motor duckdb não volta a tentar anexar a base SQLite."""
+    duckdb = load_duckdb()
+    if duckdb is None:
+        return False
+    conn = duckdb.connect()
+    try:
+        conn.execute('INSTALL sqlite')
+        conn.execute('LOAD sqlite')
+    except duckdb.Error:
+        return False
+    finally:
+        conn.close()
+    return True
+
+def run_parallel(tasks, timings=None):
+    """Executa tarefas independentes {nome: função} em um pool de threads e devolve {nome: resultado}.
+    
+    O tempo de cada tarefa é registrado em timings; o tempo de parede é o da tarefa mais lenta.
+    """
+    def timed(name, task):
+        start = time.perf_counter()
+        with perf.stage(name):
+            result = task()
+        return result, time.perf_counter() - start
+    
+    with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as pool:
+        futures = {name: perf.submit(pool, timed, name, task) for name, task in tasks.items()}
+        results = {}
+        for name, future in futures.items():
+            results[name], elapsed = future.result()
+            if timings is not None:
+                timings[name] = elapsed
+        return results
+
+def lttb_indices(y, threshold):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets para reduzir uma série a threshold pontos.
+    
+    Os pontos são tratados como igualmente espaçados; o primeiro e o último são sempre mantidos.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Vértice seguinte: média do próximo bloco (ou o último ponto)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = (next_start + next_end - 1) / 2, y[next_start:next_end].mean()
+        
+        x = np.arange(start, end)
+        areas = np.abs((previous - next_x) * (y[start:end] - y[previous]) - (previous - x) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+def bucket_sum(df, column, max_points):
+    """Soma column em blocos de linhas consecutivas para ter no máximo max_points barras (rótulo = 1º período)"""
+    if len(df) <= max_points:
+        return df
+    blocos = np.arange(len(df)) * max_points // len(df)
+    return df.groupby(blocos).agg(periodo=('periodo', 'first'), **{column: (column, 'sum')})
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard Executivo iFood",
@@ -18,73 +175,570 @@ st.set_page_config(
 class IFoodDashboard:
     def __init__(self, db_path='ifood_data.db'):
         self.db_path = db_path
+        self.pool = db_pool.get_pool(db_path)
+        
+    def connection(self):
+        """Conexão somente leitura emprestada do pool compartilhado (with self.connection() as conn)"""
+        return self.pool.connection()
+    
+    def is_analytics_schema(self, conn):
+        """Verdadeiro se a base usa o schema analítico do data_generator (tabelas *_base)"""
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pedidos_base'").fetchone() is not None
+    
+    @perf.timed()
+    def load_filter_options(self):
+        """Período disponível, cidades e categorias para os filtros (sem carregar os pedidos)"""
+        key = ('filtros', self.db_path, db_fingerprint(self.db_path))
+        options = FRAME_CACHE.get(key)
+        if options is None:
+            options = FRAME_CACHE.put(key, self._read_filter_options())
+        return options
+    
+    def _read_filter_options(self):
+        with self.connection() as conn:
+            if self.is_analytics_schema(conn):
+                min_date, max_date = conn.execute(
+                    "SELECT date(MIN(data_pedido), 'unixepoch'), date(MAX(data_pedido), 'unixepoch') FROM pedidos_base"
+                ).fetchone()
+            else:
+                min_date, max_date = conn.execute('SELECT MIN(data_pedido), MAX(data_pedido) FROM pedidos').fetchone()
+            
+            return {
+                'min_date': pd.Timestamp(min_date).date() if min_date else None,
+                'max_date': pd.Timestamp(max_date).date() if max_date else None,
+                'cidades': [row[0] for row in conn.execute('SELECT DISTINCT cidade FROM restaurantes ORDER BY cidade')],
+                'categorias': [row[0] for row in conn.execute('SELECT DISTINCT categoria FROM restaurantes ORDER BY categoria')]
+            }
+    
+    @perf.timed()
+    def load_data(self, filters=None):
+        """Carrega os pedidos do dashboard: cidade e categoria filtradas no SQL, período por busca binária.
+        
+        O DataFrame de cada cidade/categoria fica em cache ordenado por data_pedido; trocar o
+        período só recorta uma fatia contígua, sem nova consulta nem cópia.
+        """
+        filters = filters or {}
+        sql_filters = {name: filters.get(name) for name in ('cidade', 'categoria')}
+        key = ('pedidos', self.db_path, tuple(sql_filters.values()), db_fingerprint(self.db_path))
+        timeline = FRAME_CACHE.get_or_load(key, lambda: self._build_timeline(self._read_pedidos(sql_filters)))
+        self.df_pedidos, self.month_starts = self._slice_period(
+            timeline, filters.get('data_inicio'), filters.get('data_fim')
+        )
+        return self.df_pedidos
+    
+    @perf.timed()
+    def _build_timeline(self, df):
+        """Índice temporal do DataFrame ordenado: datas como int64 e a posição onde começa cada mês"""
+        datas = df['data_pedido'].to_numpy()
+        epoch = datas.view(np.int64)
+        if len(df) > 0:
+            meses = np.arange(datas[0].astype('datetime64[M]'), datas[-1].astype('datetime64[M]') + 1)
+        else:
+            meses = np.array([], dtype='datetime64[M]')
+        return {
+            'pedidos': df,
+            'epoch': epoch,
+            'unidade': datas.dtype,
+            'meses': np.datetime_as_string(meses, unit='M'),
+            'inicio_mes': np.searchsorted(epoch, meses.astype(datas.dtype).view(np.int64))
+        }
+    
+    @perf.timed()
+    def _slice_period(self, timeline, data_inicio=None, data_fim=None):
+        """Fatia [data_inicio, data_fim + 1 dia) do DataFrame ordenado e os inícios de mês dentro dela"""
+        epoch = timeline['epoch']
+        
+        def position(day):
+            return int(np.searchsorted(epoch, np.datetime64(day, 'D').astype(timeline['unidade']).view(np.int64)))
+        
+        inicio = position(pd.Timestamp(data_inicio).date()) if data_inicio is not None else 0
+        fim = position(pd.Timestamp(data_fim).date() + timedelta(days=1)) if data_fim is not None else len(epoch)
+        fim = max(inicio, fim)
+        month_starts = (timeline['meses'], np.clip(timeline['inicio_mes'] - inicio, 0, fim - inicio))
+        return timeline['pedidos'].iloc[inicio:fim], month_starts
+    
+    def snapshot_current(self, snapshot_path):
+        """snapshot.is_current, conferido uma vez por versão da base e do snapshot exportado"""
+        try:
+            exported = os.stat(os.path.join(snapshot_path, snapshot.MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        key = ('snapshot', self.db_path, (exported, db_fingerprint(self.db_path)))
+        current = FRAME_CACHE.get(key)
+        if current is None:
+            with self.connection() as conn:
+                current = FRAME_CACHE.put(key, snapshot.is_current(snapshot_path, conn))
+        return current
+    
+    @perf.timed()
+    def _read_pedidos(self, filters):
+        """Lê o join de pedidos, restaurantes e usuários direto do SQLite, só com as linhas selecionadas, em ordem de data"""
+        snapshot_path = snapshot.default_path(self.db_path)
+        use_snapshot = self.snapshot_current(snapshot_path)
+        with self.connection() as conn:
+            analytics = self.is_analytics_schema(conn)
+        if use_snapshot:
+            # Snapshot Parquet atualizado (python snapshot.py): só as colunas e linhas pedidas, sem o join no SQLite
+            with perf.stage('snapshot.load_orders'):
+                df_pedidos = snapshot.load_orders(snapshot_path, list(ORDER_COLUMNS), filters)
+            with perf.stage('sort_values'):
+                df_pedidos = df_pedidos.sort_values('data_pedido', kind='stable', ignore_index=True)
+            return self._compact_dtypes(df_pedidos)
+        
+        where, params = self._where_clause(filters, analytics)
         
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
-    
-    def load_data(self):
-        """Carrega dados principais para o dashboard"""
-        conn = self.get_connection()
-        
-        # Dados de pedidos com informações de restaurantes
-        query_pedidos = """
-        SELECT 
-            p.*,
-            r.nome as restaurante_nome,
-            r.categoria,
-            r.cidade,
-            r.rating as restaurante_rating,
-            u.segmento as usuario_segmento
-        FROM pedidos p
-        JOIN restaurantes r ON p.restaurante_id = r.id
-        JOIN usuarios u ON p.usuario_id = u.id
+        # Só as colunas usadas pelos KPIs e gráficos; no schema analítico, os códigos viram nomes nas dimensões
+        columns = ORDER_COLUMNS_ANALYTICS if analytics else ORDER_COLUMNS
+        query_pedidos = f"""
+        SELECT {', '.join(f'{expression} AS {name}' for name, expression in columns.items())}
+        {self._from_clause(analytics)}
+        {where}
         """
         
-        self.df_pedidos = pd.read_sql(query_pedidos, conn)
-        self.df_pedidos['data_pedido'] = pd.to_datetime(self.df_pedidos['data_pedido'])
+        with perf.stage('read_sql'), self.connection() as conn:
+            df_pedidos = pd.read_sql(query_pedidos, conn, params=params)
         
-        conn.close()
-        return self.df_pedidos
+        with perf.stage('to_datetime'):
+            if analytics:
+                df_pedidos['data_pedido'] = pd.to_datetime(df_pedidos['data_pedido'], unit='s')
+            else:
+                df_pedidos['data_pedido'] = pd.to_datetime(df_pedidos['data_pedido'], format='ISO8601')
+        
+        # Ordena em memória: ORDER BY faria o SQLite percorrer o índice de data com acesso aleatório às linhas
+        with perf.stage('sort_values'):
+            df_pedidos = df_pedidos.sort_values('data_pedido', kind='stable', ignore_index=True)
+        return self._compact_dtypes(df_pedidos)
     
-    def calculate_kpis(self):
-        """Calcula KPIs principais"""
+    @perf.timed()
+    def _compact_dtypes(self, df):
+        """Textos repetidos viram Categorical e números o menor tipo que comporta os valores"""
+        for column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+        for column in INTEGER_COLUMNS:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+        for column in FLOAT32_COLUMNS:
+            df[column] = df[column].astype('float32')
+        return df
+    
+    def memory_report(self):
+        """Memória por coluna do DataFrame de pedidos: tipos compactos vs. tipos padrão do read_sql"""
         df = self.df_pedidos
+        generic = df.astype({
+            **{column: object for column in CATEGORY_COLUMNS},
+            **{column: 'int64' for column in INTEGER_COLUMNS},
+            **{column: 'float64' for column in FLOAT32_COLUMNS}
+        })
+        report = pd.DataFrame({
+            'Tipo padrão': generic.dtypes.astype(str),
+            'MB padrão': generic.memory_usage(deep=True, index=False) / 2**20,
+            'Tipo compacto': df.dtypes.astype(str),
+            'MB compacto': df.memory_usage(deep=True, index=False) / 2**20
+        })
+        report.loc['Total'] = ['', report['MB padrão'].sum(), '', report['MB compacto'].sum()]
+        report['Economia'] = (1 - report['MB compacto'] / report['MB padrão']).map('{:.0%}'.format)
+        return report.round(3).rename_axis('Coluna').reset_index()
+    
+    def _from_clause(self, analytics):
+        """Join de pedidos com restaurantes e usuários (aliases p, r, u; c, d, s no schema analítico)"""
+        if analytics:
+            return """
+            FROM pedidos_base p
+            JOIN restaurantes_base r ON p.restaurante_id = r.id
+            JOIN dim_categoria c ON r.categoria_id = c.id
+            JOIN dim_cidade d ON r.cidade_id = d.id
+            JOIN usuarios_base u ON p.usuario_id = u.id
+            LEFT JOIN dim_status s ON p.status_id = s.id
+            """
+        return """
+            FROM pedidos p
+            JOIN restaurantes r ON p.restaurante_id = r.id
+            JOIN usuarios u ON p.usuario_id = u.id
+            """
+    
+    @perf.timed()
+    def load_view(self, filters=None, distintos=DISTINCT_COUNTS):
+        """KPIs e tabelas de uma combinação de filtros, em cache LRU entre reruns e sessões.
         
-        # Filtrar apenas pedidos entregues para KPIs principais
-        df_entregues = df[df['status'] == 'Entregue']
+        As figuras não fazem parte da visão: cada seção é montada só quando aberta (load_section).
+        """
+        filters = filters or {}
+        return VIEW_CACHE.get_or_load(self._view_key(filters, distintos), lambda: self._build_view(filters, distintos))
+    
+    def _view_key(self, filters, distintos):
+        filter_key = tuple(filters.get(name) for name in FILTERS)
+        return ('visao', self.db_path, DASHBOARD_ENGINE, filter_key, distintos, db_fingerprint(self.db_path))
+    
+    @perf.timed()
+    def _build_view(self, filters, distintos='exact'):
+        """Calcula os agregados (rollup, duckdb ou pandas) de uma combinação de filtros.
         
-        # Verificar se há dados
-        total_pedidos = len(df)
-        total_entregues = len(df_entregues)
-        
-        kpis = {
-            'total_pedidos': total_pedidos,
-            'total_receita': df_entregues['valor_pedido'].sum() if total_entregues > 0 else 0,
-            'ticket_medio': df_entregues['valor_pedido'].mean() if total_entregues > 0 else 0,
-            'tempo_medio_entrega': df_entregues['tempo_entrega'].mean() if total_entregues > 0 else 0,
-            'taxa_cancelamento': (len(df[df['status'] == 'Cancelado']) / total_pedidos * 100) if total_pedidos > 0 else 0,
-            'rating_medio': df_entregues['avaliacao'].mean() if total_entregues > 0 else 0,
-            'restaurantes_ativos': df['restaurante_id'].nunique() if total_pedidos > 0 else 0,
-            'usuarios_ativos': df['usuario_id'].nunique() if total_pedidos > 0 else 0
+        As consultas independentes rodam em paralelo; o tempo de cada etapa fica em 'tempos'.
+        No motor rollup com contagens exatas, os distintos por cidade e segmento ficam para
+        as respectivas seções ('pendentes').
+        """
+        start = time.perf_counter()
+        timings = {}
+        aggregates, engine = None, DASHBOARD_ENGINE
+        # Sem sketches atualizados, as contagens distintas voltam a ser exatas
+        approximate = distintos == 'hll' and self.sketches_available()
+        
+        def sketch_distinct():
+            step = time.perf_counter()
+            distinct = self._query(lambda conn: rollups.load_sketch_distinct(conn, filters))
+            timings['sketches'] = time.perf_counter() - step
+            return distinct
+        
+        if engine == 'rollup':
+            aggregates = self.load_aggregates(filters, timings, approximate)
+        elif engine == 'duckdb' and load_duckdb() is not None:
+            distinct = sketch_distinct() if approximate else None
+            step = time.perf_counter()
+            aggregates = self.load_aggregates_duckdb(filters, distinct)
+            timings['duckdb'] = time.perf_counter() - step
+        if aggregates is None:
+            distinct = sketch_distinct() if approximate else None
+            step = time.perf_counter()
+            self.load_data(filters)
+            timings['pedidos'] = time.perf_counter() - step
+            aggregates = self.compute_aggregates(timings, distinct)
+            engine = 'pandas'
+        
+        timings['total'] = time.perf_counter() - start
+        return {
+            **aggregates,
+            'pendentes': ('cidade', 'segmento') if engine == 'rollup' and not approximate else (),
+            'motor': engine,
+            'distintos': 'hll' if approximate else 'exact',
+            'tempos': timings
+        }
+    
+    @perf.timed()
+    def load_section(self, view, name, filters=None, granularidade='Mensal'):
+        """Figura (em JSON) e tabela de uma seção da visão, montadas só quando a seção é aberta.
+        
+        O resultado fica no cache de visões junto da visão de origem; só a seção de receita
+        depende da granularidade. No modo ao vivo (estado que muda a cada consulta), não há cache.
+        """
+        filters = filters or {}
+        if view['motor'] == 'ao vivo':
+            return self._build_section(view, name, filters, granularidade)
+        # Impressão digital da base por último, como nas demais chaves: o cache só descarta
+        # a mesma seção de uma versão anterior da base, nunca a de outra granularidade
+        *view_key, fingerprint = self._view_key(filters, view['distintos'])
+        key = (*view_key, 'secao', name, granularidade if name == 'receita' else None, fingerprint)
+        return VIEW_CACHE.get_or_load(key, lambda: self._build_section(view, name, filters, granularidade))
+    
+    def _build_section(self, view, name, filters, granularidade):
+        start = time.perf_counter()
+        timings = {}
+        source, builder = SECTIONS[name]
+        table = view[source]
+        if name in view['pendentes']:
+            # Contagens distintas exatas adiadas pelo motor rollup: só a consulta desta seção
+            with self.connection() as conn:
+                analytics = self.is_analytics_schema(conn)
+            query = f'distintos_{name}'
+            distinct = run_parallel({query: self._distinct_queries(filters, analytics)[query]}, timings)[query]
+            complete = rollups.with_city_distinct if name == 'cidade' else rollups.with_segment_distinct
+            table = complete(table, distinct)
+        
+        # Figuras guardadas em JSON: reconstruí-las é bem mais barato que refazer os gráficos
+        # com plotly express, e cada sessão recebe a sua cópia
+        step = time.perf_counter()
+        with perf.stage(f'secao:{name}'):
+            build = getattr(self, builder)
+            result = build(table, granularidade) if name == 'receita' else build(table)
+            chart, table = result if isinstance(result, tuple) else (result, table)
+            with perf.stage('to_json'):
+                chart = chart.to_json()
+        timings[name] = time.perf_counter() - step
+        timings['total'] = time.perf_counter() - start
+        return {'figura': chart, 'tabela': table, 'tempos': timings}
+    
+    @perf.timed()
+    def load_live_view(self, filters=None):
+        """Visão do modo ao vivo: só os pedidos novos desde a última consulta são lidos e somados
+        ao rollup e aos sketches em memória (live.py). Não passa pelo cache de visões.
+        None se a base não tiver rollups gravados (o estado exigiria reler todo o histórico)."""
+        start = time.perf_counter()
+        timings = {}
+        tail = live.get_tail(self.db_path)
+        step = time.perf_counter()
+        novos = tail.poll()
+        if novos is None:
+            return None
+        timings['novos pedidos'] = time.perf_counter() - step
+        step = time.perf_counter()
+        aggregates = tail.aggregates(filters)
+        timings['agregados'] = time.perf_counter() - step
+        
+        timings['total'] = time.perf_counter() - start
+        return {
+            **aggregates,
+            'pendentes': (),
+            'motor': 'ao vivo',
+            'distintos': 'hll',
+            'tempos': timings,
+            'ao_vivo': {'marca': tail.watermark, 'novos': novos}
+        }
+    
+    @perf.timed()
+    def figure(self, section):
+        """Reconstrói a figura serializada de uma seção"""
+        import plotly.io as pio
+        return pio.from_json(section['figura'])
+    
+    @perf.timed()
+    def sketches_available(self):
+        """Verdadeiro se há sketches HLL em rollup_sketch (pedidos ainda não incluídos são unidos na consulta)"""
+        return self._query(rollups.sketches_available)
+    
+    @perf.timed()
+    def load_aggregates(self, filters=None, timings=None, approximate=False):
+        """KPIs e tabelas dos gráficos a partir do rollup diário (None se não houver rollup gravado).
+        
+        Com approximate, as contagens distintas saem da união dos sketches HLL em vez de COUNT(DISTINCT);
+        sem ele, só os distintos dos KPIs são consultados e as tabelas por cidade e segmento saem sem
+        as colunas de distintos, completadas por load_section.
+        """
+        filters = filters or {}
+        with self.connection() as conn:
+            if not rollups.rollups_available(conn):
+                return None
+            analytics = self.is_analytics_schema(conn)
+        
+        if approximate:
+            results = run_parallel({
+                'rollup': lambda: self._query(lambda conn: rollups.load_rollup(conn, filters)),
+                'sketches': lambda: self._query(lambda conn: rollups.load_sketch_distinct(conn, filters))
+            }, timings)
+            return rollups.aggregates_from_rollup(results['rollup'], results['sketches'])
+        
+        # Rollup e contagens distintas são consultas independentes: cada uma em sua conexão.
+        # Os distintos por cidade e segmento ficam para quando essas seções forem abertas
+        results = run_parallel({
+            'rollup': lambda: self._query(lambda conn: rollups.load_rollup(conn, filters)),
+            'distintos': self._distinct_queries(filters, analytics)['distintos']
+        }, timings)
+        restaurantes, usuarios = results['distintos']
+        return rollups.aggregates_from_rollup(results['rollup'], {
+            'restaurantes_ativos': restaurantes,
+            'usuarios_ativos': usuarios
+        })
+    
+    @perf.timed()
+    def load_aggregates_duckdb(self, filters=None, distinct=None):
+        """KPIs e tabelas dos gráficos calculados no DuckDB (None se o duckdb não estiver instalado ou falhar).
+        
+        As agregações rodam em SQL colunar com várias threads; só o rollup mensal, a série diária e
+        as contagens distintas voltam para o Python, e aggregates_from_rollup monta as tabelas exatamente
+        como nos outros motores. distinct (por exemplo, dos sketches HLL) dispensa as contagens distintas.
+        """
+        duckdb = load_duckdb()
+        if duckdb is None:
+            return None
+        filters = filters or {}
+
+        conn = duckdb.connect()
+        try:
+            source = self._duckdb_source(conn, filters)
+            if source is None:
+                return None
+            source, params = source
+            
+            def query(sql):
+                return conn.execute(f"WITH selecao AS ({source}) {sql}", params)
+            
+            rollup = query("""
+                SELECT strftime(data_pedido, '%Y-%m') AS dia,
+                       COALESCE(cidade, '') AS cidade,
+                       COALESCE(categoria, '') AS categoria,
+                       COALESCE(usuario_segmento, '') AS segmento,
+                       COALESCE(status, '') AS status,
+                       COUNT(*) AS pedidos,
+                       COALESCE(SUM(valor_pedido), 0) AS receita,
+                       COALESCE(SUM(tempo_entrega), 0) AS tempo_entrega_soma,
+                       COALESCE(SUM(avaliacao), 0) AS avaliacao_soma,
+                       COUNT(avaliacao) AS avaliacao_qtd
+                FROM selecao
+                GROUP BY ALL
+            """).df()
+            if distinct is None:
+                restaurantes, usuarios = query(
+                    'SELECT COUNT(DISTINCT restaurante_id), COUNT(DISTINCT usuario_id) FROM selecao'
+                ).fetchone()
+                distinct = {
+                    'restaurantes_ativos': restaurantes,
+                    'usuarios_ativos': usuarios,
+                    'cidade': query("""
+                        SELECT cidade, COUNT(DISTINCT restaurante_id) AS "Restaurantes",
+                               COUNT(DISTINCT usuario_id) AS "Usuários"
+                        FROM selecao WHERE status = 'Entregue' GROUP BY cidade
+                    """).df(),
+                    'segmento': query("""
+                        SELECT usuario_segmento, COUNT(DISTINCT usuario_id) AS "Total Usuários"
+                        FROM selecao WHERE status = 'Entregue' GROUP BY usuario_segmento
+                    """).df()
+                }
+            diario = query("""
+                SELECT strftime(data_pedido, '%Y-%m-%d') AS dia, SUM(valor_pedido) AS valor_pedido, COUNT(*) AS id
+                FROM selecao WHERE status = 'Entregue' GROUP BY dia
+            """).df()
+        except duckdb.Error:
+            # Qualquer erro do DuckDB devolve None e a visão é montada pelo pandas (motor exibido na tela)
+            return None
+        finally:
+            conn.close()
+        return rollups.aggregates_from_rollup(rollup, distinct, diario)
+    
+    def _duckdb_source(self, conn, filters):
+        """Consulta (e parâmetros) dos pedidos selecionados: snapshot Parquet se atualizado, senão a base SQLite.
+        
+        None se for preciso ler a base SQLite e a extensão sqlite do DuckDB não estiver disponível.
+        """
+        snapshot_path = snapshot.default_path(self.db_path)
+        use_snapshot = self.snapshot_current(snapshot_path)
+        if not use_snapshot and not duckdb_sqlite_available():
+            return None
+        with self.connection() as sqlite_conn:
+            analytics = self.is_analytics_schema(sqlite_conn)
+        
+        if use_snapshot:
+            # Lido a cada consulta, só com as colunas que ela usa; o filtro por mês descarta partições inteiras
+            conditions, params = [], []
+            if filters.get('data_inicio') is not None:
+                inicio = pd.Timestamp(filters['data_inicio']).normalize()
+                conditions += ['mes >= ?', 'data_pedido >= ?']
+                params += [inicio.strftime('%Y-%m'), inicio.to_pydatetime()]
+            if filters.get('data_fim') is not None:
+                fim = pd.Timestamp(filters['data_fim']).normalize()
+                conditions += ['mes <= ?', 'data_pedido < ?']
+                params += [fim.strftime('%Y-%m'), (fim + pd.Timedelta(days=1)).to_pydatetime()]
+            for name in ('cidade', 'categoria'):
+                if filters.get(name) is not None:
+                    conditions.append(f'{name} = ?')
+                    params.append(filters[name])
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            files = os.path.join(snapshot_path, 'pedidos', '*', '*.parquet').replace("'", "''")
+            return f"""
+                SELECT {', '.join(ORDER_COLUMNS)}
+                FROM read_parquet('{files}', hive_partitioning = true, hive_types = {{'mes': VARCHAR}})
+                {where}
+            """, params
+        
+        # Base SQLite anexada (extensão sqlite do DuckDB), com o mesmo join e filtros do pandas.
+        # A seleção é copiada uma vez para uma tabela colunar, em vez de varrer o SQLite a cada consulta
+        conn.execute(f"ATTACH '{self.db_path.replace(chr(39), chr(39) * 2)}' AS fonte (TYPE sqlite, READ_ONLY)")
+        conn.execute('USE fonte')
+        where, params = self._where_clause(filters, analytics)
+        columns = dict(ORDER_COLUMNS_ANALYTICS if analytics else ORDER_COLUMNS)
+        columns['data_pedido'] = 'make_timestamp(p.data_pedido * 1000000)' if analytics else 'CAST(p.data_pedido AS TIMESTAMP)'
+        conn.execute(f"""
+            CREATE TEMP TABLE pedidos_selecionados AS
+            SELECT {', '.join(f'{expression} AS {name}' for name, expression in columns.items())}
+            {self._from_clause(analytics)}
+            {where}
+        """, params)
+        return 'SELECT * FROM temp.pedidos_selecionados', []
+    
+    def _query(self, run):
+        """Executa run(conn) em uma conexão própria do pool, para consultas disparadas em outras threads"""
+        with self.connection() as conn:
+            return run(conn)
+    
+    def _distinct_queries(self, filters, analytics):
+        """Consultas de restaurantes e usuários distintos da seleção (não podem ser somados a partir do rollup)"""
+        where, params = self._where_clause(filters, analytics)
+        source = self._from_clause(analytics)
+        cidade = 'd.nome' if analytics else 'r.cidade'
+        entregue = "s.nome = 'Entregue'" if analytics else "p.status = 'Entregue'"
+        where_entregues = f"{where} AND {entregue}" if where else f"WHERE {entregue}"
+        
+        return {
+            'distintos': lambda: self._query(lambda conn: conn.execute(
+                f"SELECT COUNT(DISTINCT p.restaurante_id), COUNT(DISTINCT p.usuario_id) {source} {where}", params
+            ).fetchone()),
+            'distintos_cidade': lambda: self._query(lambda conn: pd.read_sql(
+                f"""SELECT {cidade} AS cidade, COUNT(DISTINCT p.restaurante_id) AS "Restaurantes",
+                           COUNT(DISTINCT p.usuario_id) AS "Usuários"
+                    {source} {where_entregues} GROUP BY 1""", conn, params=params)),
+            'distintos_segmento': lambda: self._query(lambda conn: pd.read_sql(
+                f"""SELECT u.segmento AS usuario_segmento, COUNT(DISTINCT p.usuario_id) AS "Total Usuários"
+                    {source} {where_entregues} GROUP BY 1""", conn, params=params))
         }
+    
+    @perf.timed()
+    def compute_aggregates(self, timings=None, distinct=None):
+        """KPIs e tabelas dos gráficos calculados sobre o DataFrame de pedidos carregado.
         
-        # Tratar valores NaN
-        for key, value in kpis.items():
-            if pd.isna(value):
-                kpis[key] = 0
+        Os pedidos são reduzidos uma única vez a um rollup mensal e KPIs e tabelas saem dele,
+        pelo mesmo código do motor 'rollup': o custo por rerun depende do número de grupos.
+        A série diária do gráfico de evolução sai de um bincount à parte. As três reduções são
+        independentes e rodam em paralelo; distinct (por exemplo, dos sketches HLL) dispensa
+        as contagens distintas exatas.
+        """
+        df, month_starts = self.df_pedidos, self.month_starts
+        tasks = {
+            'rollup': lambda: rollups.rollup_from_orders(df, month_starts),
+            'diario': lambda: rollups.daily_from_orders(df)
+        }
+        if distinct is None:
+            tasks['distintos'] = lambda: rollups.distinct_from_orders(df)
+        results = run_parallel(tasks, timings)
+        distinct = results['distintos'] if distinct is None else distinct
+        return rollups.aggregates_from_rollup(results['rollup'], distinct, results['diario'])
+    
+    def _where_clause(self, filters, analytics):
+        """Monta o WHERE parametrizado a partir dos filtros da barra lateral"""
+        conditions, params = [], []
         
-        return kpis
+        # Período: [data_inicio, data_fim + 1 dia), comparando texto ISO ou epoch
+        for name, operator, offset in (('data_inicio', '>=', 0), ('data_fim', '<', 1)):
+            if filters.get(name) is not None:
+                limit = pd.Timestamp(filters[name]) + pd.Timedelta(days=offset)
+                conditions.append(f"p.data_pedido {operator} ?")
+                params.append(int(limit.timestamp()) if analytics else limit.date().isoformat())
+        
+        if filters.get('cidade') is not None:
+            conditions.append('d.nome = ?' if analytics else 'r.cidade = ?')
+            params.append(filters['cidade'])
+        
+        if filters.get('categoria') is not None:
+            conditions.append('c.nome = ?' if analytics else 'r.categoria = ?')
+            params.append(filters['categoria'])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
     
-    def create_revenue_chart(self):
+    def calculate_kpis(self):
+        """Calcula KPIs principais"""
+        return self.compute_aggregates()['kpis']
+    
+    def resample_series(self, diario, granularidade='Mensal'):
+        """Reagrupa a série diária de receita e pedidos por dia, semana (início na segunda) ou mês"""
+        dias = pd.to_datetime(diario['dia'])
+        if granularidade == 'Mensal':
+            periodo = dias.dt.strftime('%Y-%m')
+        elif granularidade == 'Semanal':
+            periodo = (dias - pd.to_timedelta(dias.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+        else:
+            periodo = diario['dia']
+        return diario.groupby(periodo.rename('periodo').to_numpy())[['valor_pedido', 'id']].sum().rename_axis('periodo').reset_index()
+    
+    @perf.timed()
+    def create_revenue_chart(self, diario=None, granularidade='Mensal'):
         """Gráfico de receita ao longo do tempo"""
-        df_entregues = self.df_pedidos[self.df_pedidos['status'] == 'Entregue'].copy()
+        _, go, make_subplots = plotly_modules()
+        if diario is None:
+            diario = self.compute_aggregates()['diario']
+        titulos = (f"Receita {granularidade} (R$)", 'Volume de Pedidos')
         
         # Verificar se há dados
-        if len(df_entregues) == 0:
+        if len(diario) == 0:
             # Criar gráfico vazio
             fig = make_subplots(
                 rows=2, cols=1,
-                subplot_titles=('Receita Mensal (R$)', 'Volume de Pedidos'),
+                subplot_titles=titulos,
                 vertical_spacing=0.1
             )
             fig.update_layout(
@@ -105,27 +759,25 @@ class IFoodDashboard:
             )
             return fig
         
-        df_entregues['mes'] = df_entregues['data_pedido'].dt.to_period('M')
-        
-        receita_mensal = df_entregues.groupby('mes').agg({
-            'valor_pedido': 'sum',
-            'id': 'count'
-        }).reset_index()
+        serie = self.resample_series(diario, granularidade)
         
-        receita_mensal['mes'] = receita_mensal['mes'].astype(str)
+        # Séries longas são reduzidas a MAX_CHART_POINTS pontos: LTTB preserva o formato da linha
+        # de receita; as barras de volume são somadas em blocos de períodos consecutivos
+        linha = serie.iloc[lttb_indices(serie['valor_pedido'].to_numpy(), MAX_CHART_POINTS)]
+        barras = bucket_sum(serie, 'id', MAX_CHART_POINTS)
         
         fig = make_subplots(
             rows=2, cols=1,
-            subplot_titles=('Receita Mensal (R$)', 'Volume de Pedidos'),
+            subplot_titles=titulos,
             vertical_spacing=0.1
         )
         
         # Receita
         fig.add_trace(
             go.Scatter(
-                x=receita_mensal['mes'],
-                y=receita_mensal['valor_pedido'],
-                mode='lines+markers',
+                x=linha['periodo'],
+                y=linha['valor_pedido'].round(2),
+                mode='lines+markers' if len(linha) <= 60 else 'lines',
                 name='Receita',
                 line=dict(color='#FF6B35', width=3)
             ),
@@ -135,8 +787,8 @@ class IFoodDashboard:
         # Volume de pedidos
         fig.add_trace(
             go.Bar(
-                x=receita_mensal['mes'],
-                y=receita_mensal['id'],
+                x=barras['periodo'],
+                y=barras['id'],
                 name='Pedidos',
                 marker_color='#004E89'
             ),
@@ -151,12 +803,15 @@ class IFoodDashboard:
         
         return fig
     
-    def create_category_performance(self):
+    @perf.timed()
+    def create_category_performance(self, performance=None):
         """Performance por categoria de restaurante"""
-        df_entregues = self.df_pedidos[self.df_pedidos['status'] == 'Entregue']
+        px, _, _ = plotly_modules()
+        if performance is None:
+            performance = self.compute_aggregates()['categoria']
         
         # Verificar se há dados
-        if len(df_entregues) == 0:
+        if len(performance) == 0:
             fig = px.scatter(
                 title="Performance por Categoria de Restaurante",
                 labels={
@@ -176,15 +831,6 @@ class IFoodDashboard:
             fig.update_layout(height=500)
             return fig
         
-        performance = df_entregues.groupby('categoria').agg({
-            'valor_pedido': ['sum', 'mean', 'count'],
-            'tempo_entrega': 'mean',
-            'avaliacao': 'mean'
-        }).round(2)
-        
-        performance.columns = ['Receita Total', 'Ticket Médio', 'Total Pedidos', 'Tempo Médio', 'Rating Médio']
-        performance = performance.reset_index()
-        
         # Gráfico de bolhas
         fig = px.scatter(
             performance,
@@ -205,12 +851,15 @@ class IFoodDashboard:
         fig.update_layout(height=500)
         return fig
     
-    def create_city_analysis(self):
+    @perf.timed()
+    def create_city_analysis(self, city_performance=None):
         """Análise por cidade"""
-        df_entregues = self.df_pedidos[self.df_pedidos['status'] == 'Entregue']
+        px, _, _ = plotly_modules()
+        if city_performance is None:
+            city_performance = self.compute_aggregates()['cidade']
         
         # Verificar se há dados
-        if len(df_entregues) == 0:
+        if len(city_performance) == 0:
             empty_df = pd.DataFrame(columns=['cidade', 'Receita', 'Pedidos por Restaurante'])
             fig = px.bar(
                 empty_df,
@@ -232,17 +881,6 @@ class IFoodDashboard:
             fig.update_layout(height=400)
             return fig, empty_df
         
-        city_performance = df_entregues.groupby('cidade').agg({
-            'valor_pedido': 'sum',
-            'id': 'count',
-            'restaurante_id': 'nunique',
-            'usuario_id': 'nunique'
-        }).round(2)
-        
-        city_performance.columns = ['Receita', 'Pedidos', 'Restaurantes', 'Usuários']
-        city_performance['Pedidos por Restaurante'] = city_performance['Pedidos'] / city_performance['Restaurantes']
-        city_performance = city_performance.reset_index()
-        
         fig = px.bar(
             city_performance.sort_values('Receita', ascending=True),
             x='Receita',
@@ -255,12 +893,15 @@ class IFoodDashboard:
         fig.update_layout(height=400)
         return fig, city_performance
     
-    def create_user_segmentation(self):
+    @perf.timed()
+    def create_user_segmentation(self, segmentation=None):
         """Análise de segmentação de usuários"""
-        df_entregues = self.df_pedidos[self.df_pedidos['status'] == 'Entregue']
+        px, _, _ = plotly_modules()
+        if segmentation is None:
+            segmentation = self.compute_aggregates()['segmento']
         
         # Verificar se há dados
-        if len(df_entregues) == 0:
+        if len(segmentation) == 0:
             empty_df = pd.DataFrame(columns=['usuario_segmento', 'Receita Total', 'Ticket Médio', 'Total Pedidos', 'Total Usuários', 'Pedidos por Usuário'])
             fig = px.pie(
                 empty_df,
@@ -280,15 +921,6 @@ class IFoodDashboard:
             fig.update_layout(height=400)
             return fig, empty_df
         
-        segmentation = df_entregues.groupby('usuario_segmento').agg({
-            'valor_pedido': ['sum', 'mean', 'count'],
-            'usuario_id': 'nunique'
-        }).round(2)
-        
-        segmentation.columns = ['Receita Total', 'Ticket Médio', 'Total Pedidos', 'Total Usuários']
-        segmentation['Pedidos por Usuário'] = segmentation['Total Pedidos'] / segmentation['Total Usuários']
-        segmentation = segmentation.reset_index()
-        
         # Gráfico de pizza para receita por segmento
         fig = px.pie(
             segmentation,
@@ -300,27 +932,77 @@ class IFoodDashboard:
         fig.update_layout(height=400)
         return fig, segmentation
 
+def default_filters(opcoes):
+    """Filtros da primeira visita: período completo, todas as cidades e categorias"""
+    return {'data_inicio': opcoes['min_date'], 'data_fim': opcoes['max_date'], 'cidade': None, 'categoria': None}
+
+def warm_up(db_path):
+    """Carrega em segundo plano, nos caches compartilhados, o que a primeira visita usa.
+    
+    Sessões que pedem a mesma visão durante o aquecimento esperam a carga em andamento
+    (get_or_load) em vez de repeti-la.
+    """
+    trace = perf.start_trace('aquecimento')
+    try:
+        plotly_modules()
+        dashboard = IFoodDashboard(db_path)
+        opcoes = dashboard.load_filter_options()
+        if opcoes['min_date'] is not None:
+            filtros = default_filters(opcoes)
+            view = dashboard.load_view(filtros)
+            dashboard.load_section(view, 'receita', filtros)
+    except Exception as e:
+        # Base ausente ou com erro: a primeira sessão mostra a mensagem ao usuário
+        perf.logger.warning(f"Aquecimento de {db_path} interrompido: {e}")
+    finally:
+        trace.finish()
+
+def show_performance(trace, panel):
+    """Fecha o Trace do rerun (linha de log de resumo) e preenche o painel de desempenho, se ativo"""
+    elapsed = trace.finish()
+    if panel is not None:
+        rss = perf.rss_bytes()
+        with panel.container():
+            st.caption(f"⏱️ Rerun: {elapsed * 1000:,.0f} ms" + (f" · memória residente {rss / 2**20:,.0f} MB" if rss else ""))
+            st.dataframe(trace.to_frame(), hide_index=True)
+
+def schedule_refresh(intervalo):
+    """Modo ao vivo: aguarda o intervalo e reexecuta o script para consultar os pedidos novos"""
+    time.sleep(intervalo)
+    st.rerun()
+
 def main():
+    trace = perf.start_trace()
     st.title("🍴 Dashboard Executivo iFood")
     st.markdown("### Análise Estratégica do Mercado de Delivery")
     
+    # Importação dos módulos, medida antes do Trace existir (só a primeira execução paga o custo completo)
+    trace.record('imports', trace.started - IMPORT_SECONDS, IMPORT_SECONDS, None, 0)
+    
     # Inicializar dashboard
     dashboard = IFoodDashboard()
+    if WARMUP:
+        start_warmup(('aquecimento', dashboard.db_path, db_fingerprint(dashboard.db_path)),
+                     lambda: warm_up(dashboard.db_path))
     
     # Verificar se existe banco de dados
     try:
-        df_pedidos = dashboard.load_data()
+        opcoes = dashboard.load_filter_options()
     except:
         st.error("⚠️ Base de dados não encontrada. Execute primeiro o script data_generator.py")
         st.code("python data_generator.py")
         return
     
+    if opcoes['min_date'] is None:
+        st.warning("⚠️ A base de dados não possui pedidos. Execute o script data_generator.py")
+        st.stop()
+    
     # Sidebar com filtros
     st.sidebar.header("🔍 Filtros")
     
     # Filtro de data
-    min_date = df_pedidos['data_pedido'].min().date()
-    max_date = df_pedidos['data_pedido'].max().date()
+    min_date = opcoes['min_date']
+    max_date = opcoes['max_date']
     
     date_range = st.sidebar.date_input(
         "Período de Análise",
@@ -330,38 +1012,74 @@ def main():
     )
     
     # Filtro de cidade
-    cidades_disponiveis = ['Todas'] + sorted(df_pedidos['cidade'].unique().tolist())
+    cidades_disponiveis = ['Todas'] + opcoes['cidades']
     cidade_selecionada = st.sidebar.selectbox("Cidade", cidades_disponiveis)
     
     # Filtro de categoria
-    categorias_disponiveis = ['Todas'] + sorted(df_pedidos['categoria'].unique().tolist())
+    categorias_disponiveis = ['Todas'] + opcoes['categorias']
     categoria_selecionada = st.sidebar.selectbox("Categoria", categorias_disponiveis)
     
-    # Aplicar filtros
-    df_filtered = df_pedidos.copy()
+    # Granularidade do gráfico de evolução
+    granularidade = st.sidebar.radio("Granularidade da evolução", GRANULARITIES, index=2, horizontal=True)
     
-    if len(date_range) == 2:
-        df_filtered = df_filtered[
-            (df_filtered['data_pedido'].dt.date >= date_range[0]) & 
-            (df_filtered['data_pedido'].dt.date <= date_range[1])
-        ]
+    # Modo ao vivo: a página se reexecuta sozinha e só os pedidos novos são agregados
+    ao_vivo = st.sidebar.checkbox("🔴 Ao vivo", help="Atualiza KPIs e gráficos com os pedidos novos, sem reler o histórico")
+    intervalo = LIVE_INTERVAL
+    if ao_vivo:
+        intervalo = st.sidebar.number_input("Atualizar a cada (segundos)", min_value=1.0, value=LIVE_INTERVAL, step=1.0)
     
-    if cidade_selecionada != 'Todas':
-        df_filtered = df_filtered[df_filtered['cidade'] == cidade_selecionada]
-        
-    if categoria_selecionada != 'Todas':
-        df_filtered = df_filtered[df_filtered['categoria'] == categoria_selecionada]
+    # Aplicar filtros no SQL: só as linhas selecionadas são carregadas
+    filtros = {
+        'data_inicio': date_range[0] if len(date_range) == 2 else None,
+        'data_fim': date_range[1] if len(date_range) == 2 else None,
+        'cidade': cidade_selecionada if cidade_selecionada != 'Todas' else None,
+        'categoria': categoria_selecionada if categoria_selecionada != 'Todas' else None
+    }
+    # KPIs, tabelas e figuras: do rollup diário quando disponível, senão do DataFrame de pedidos.
+    # Combinações de filtros já vistas vêm prontas do cache de visões
+    # Contagens aproximadas (HLL) podem ser conferidas com as exatas sob demanda
+    distintos = DISTINCT_COUNTS
+    if not ao_vivo and DISTINCT_COUNTS == 'hll' and st.sidebar.checkbox("🔎 Contagens distintas exatas (auditoria)"):
+        distintos = 'exact'
+    view = dashboard.load_live_view(filtros) if ao_vivo else None
+    if ao_vivo and view is None:
+        st.sidebar.warning("⚠️ Modo ao vivo indisponível: a base não tem rollups. Execute o script data_generator.py")
+        ao_vivo = False
+    if ao_vivo:
+        st.sidebar.caption(
+            f"🔴 Ao vivo até o pedido #{view['ao_vivo']['marca']:,} · +{view['ao_vivo']['novos']:,} na última "
+            f"consulta · {datetime.now():%H:%M:%S}"
+        )
+    else:
+        view = dashboard.load_view(filtros, distintos)
+    distintos_label = f"HLL ±{2 * hll.STANDARD_ERROR:.0%}" if view['distintos'] == 'hll' else "exatos"
+    st.sidebar.caption(
+        f"⚙️ Motor: {view['motor']} · 🔢 Distintos: {distintos_label} · 🗄️ Cache de visões: {VIEW_CACHE.hits:,} acertos, "
+        f"{VIEW_CACHE.misses:,} falhas ({len(VIEW_CACHE)}/{VIEW_CACHE.max_entries} visões)"
+    )
+    # Tempos de quando a visão foi montada: consultas em paralelo, total ≈ etapa mais lenta
+    etapas = ' · '.join(f"{name} {seconds:.2f}s" for name, seconds in view['tempos'].items() if name != 'total')
+    st.sidebar.caption(f"⏱️ Montagem da visão: {view['tempos']['total']:.2f}s ({etapas})")
+    
+    if view['motor'] == 'pandas' and st.sidebar.checkbox("🧠 Mostrar uso de memória"):
+        dashboard.load_data(filtros)
+        st.sidebar.caption("DataFrame de pedidos desta seleção, compartilhado entre as sessões")
+        st.sidebar.dataframe(dashboard.memory_report(), hide_index=True)
+    
+    # Etapas deste rerun (consultas, conversões, gráficos, serialização); preenchido no final do script
+    panel = st.sidebar.empty() if st.sidebar.checkbox("⏱️ Painel de desempenho") else None
     
     # Verificar se há dados após filtros
-    if len(df_filtered) == 0:
+    if view['kpis']['total_pedidos'] == 0:
         st.warning("⚠️ Nenhum dado encontrado para os filtros selecionados. Tente alterar os filtros.")
+        show_performance(trace, panel)
+        if ao_vivo:
+            schedule_refresh(intervalo)
         st.stop()
     
-    # Atualizar dados do dashboard
-    dashboard.df_pedidos = df_filtered
-    
     # KPIs
-    kpis = dashboard.calculate_kpis()
+    kpis = view['kpis']
+    aproximado = "≈ " if view['distintos'] == 'hll' else ""
     
     st.markdown("## 📊 Indicadores Principais")
     
@@ -409,55 +1127,57 @@ def main():
     with col7:
         st.metric(
             label="🏪 Restaurantes Ativos",
-            value=f"{kpis['restaurantes_ativos']:,}",
+            value=f"{aproximado}{kpis['restaurantes_ativos']:,}",
         )
         
     with col8:
         st.metric(
             label="👥 Usuários Ativos",
-            value=f"{kpis['usuarios_ativos']:,}",
+            value=f"{aproximado}{kpis['usuarios_ativos']:,}",
         )
     
-    # Gráficos
+    # Gráficos: uma seção por vez (st.tabs executaria todas); só a seção aberta é montada
     st.markdown("## 📈 Análises Detalhadas")
+    rotulos = {
+        'receita': "📈 Evolução da Receita",
+        'categoria': "🍽️ Categorias",
+        'cidade': "🌍 Cidades",
+        'segmento': "👥 Segmentação de Usuários"
+    }
+    secao = st.radio("Seção", list(rotulos), format_func=rotulos.get, horizontal=True,
+                     label_visibility="collapsed", key="secao")
+    section = dashboard.load_section(view, secao, filtros, granularidade)
+    chart = dashboard.figure(section)
     
-    # Evolução temporal
-    col1, col2 = st.columns(2)
+    if secao in ('receita', 'categoria'):
+        with perf.stage(f'st.plotly_chart:{secao}'):
+            st.plotly_chart(chart, use_container_width=True)
     
-    with col1:
-        revenue_chart = dashboard.create_revenue_chart()
-        st.plotly_chart(revenue_chart, use_container_width=True)
-    
-    with col2:
-        category_chart = dashboard.create_category_performance()
-        st.plotly_chart(category_chart, use_container_width=True)
-    
-    # Análise por cidade
-    st.markdown("### 🌍 Performance por Cidade")
-    city_chart, city_data = dashboard.create_city_analysis()
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        st.plotly_chart(city_chart, use_container_width=True)
-    
-    with col2:
-        st.markdown("**Top 5 Cidades por Receita**")
-        top_cities = city_data.nlargest(5, 'Receita')[['cidade', 'Receita', 'Pedidos por Restaurante']]
-        st.dataframe(top_cities, hide_index=True)
-    
-    # Segmentação de usuários
-    st.markdown("### 👥 Segmentação de Usuários")
-    segmentation_chart, segmentation_data = dashboard.create_user_segmentation()
-    
-    col1, col2 = st.columns([1, 1])
+    elif secao == 'cidade':
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            with perf.stage('st.plotly_chart:cidade'):
+                st.plotly_chart(chart, use_container_width=True)
+        
+        with col2:
+            st.markdown("**Top 5 Cidades por Receita**")
+            top_cities = section['tabela'].nlargest(5, 'Receita')[['cidade', 'Receita', 'Pedidos por Restaurante']]
+            st.dataframe(top_cities, hide_index=True)
     
-    with col1:
-        st.plotly_chart(segmentation_chart, use_container_width=True)
+    else:
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            with perf.stage('st.plotly_chart:segmento'):
+                st.plotly_chart(chart, use_container_width=True)
+        
+        with col2:
+            st.markdown("**Métricas por Segmento**")
+            st.dataframe(section['tabela'], hide_index=True)
     
-    with col2:
-        st.markdown("**Métricas por Segmento**")
-        st.dataframe(segmentation_data, hide_index=True)
+    etapas = ' · '.join(f"{name} {seconds:.2f}s" for name, seconds in section['tempos'].items() if name != 'total')
+    st.caption(f"⏱️ Montagem da seção: {section['tempos']['total']:.2f}s ({etapas})")
     
     # Insights e Recomendações
     st.markdown("## 💡 Insights Estratégicos")
@@ -487,6 +1207,10 @@ def main():
     # Rodapé
     st.markdown("---")
     st.markdown("📧 **Desenvolvido para demonstrar competências em análise de dados e storytelling**")
+    
+    show_performance(trace, panel)
+    if ao_vivo:
+        schedule_refresh(intervalo)
 
 if __name__ == "__main__":
     main()
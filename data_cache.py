@@ -0,0 +1,133 @@
+"""
+Cache em memória de DataFrames compartilhado entre reruns e sessões do Streamlit.
+
+O Streamlit reexecuta o script principal a cada interação, mas módulos importados
+permanecem carregados: por isso o cache vive aqui, e não em dashboard.py. As chaves
+incluem uma impressão digital barata da base, de modo que novos dados invalidam
+automaticamente as entradas antigas.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+def db_fingerprint(db_path):
+    """Impressão digital barata da base: mtime e tamanho do arquivo e do WAL, se houver.
+
+    PRAGMA data_version não serve aqui: ele só muda entre conexões que permanecem abertas.
+    """
+    parts = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        parts.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(parts)
+
+def estimate_bytes(value):
+    """Memória ocupada por um valor em cache (DataFrames medidos com deep=True)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_bytes(v) for v in value.values())
+    return 0
+
+class FrameCache:
+    """Cache LRU limitado por memória (e opcionalmente por entradas), com chaves (nome, ..., impressão digital)"""
+
+    def __init__(self, max_bytes, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def total_bytes(self):
+        return sum(nbytes for _, nbytes in self._entries.values())
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        nbytes = estimate_bytes(value)
+        with self._lock:
+            # Entradas do mesmo nome com outra impressão digital estão obsoletas
+            for stale in [k for k in self._entries if k[:-1] == key[:-1] and k != key]:
+                del self._entries[stale]
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes)
+            self._entries.move_to_end(key)
+            while self.total_bytes > self.max_bytes or (self.max_entries and len(self._entries) > self.max_entries):
+                self._entries.popitem(last=False)
+        return value
+
+    def get_or_load(self, key, loader):
+        """Devolve o valor em cache ou o carrega uma única vez, mesmo com sessões concorrentes"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key][0]
+            value = self.put(key, loader())
+        with self._lock:
+            self._loading.pop(key, None)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+CACHE_BYTES = int(os.environ.get('IFOOD_CACHE_MB', '1024')) * 2**20
+
+FRAME_CACHE = FrameCache(max_bytes=CACHE_BYTES)
+
+# Último aquecimento por nome (chave sem a impressão digital): impressão digital e thread
+_WARMUPS = {}
+_WARMUPS_LOCK = threading.Lock()
+
+def start_warmup(key, target):
+    """Roda target em uma thread de fundo uma vez por processo e chave; devolve a thread (ou None).
+
+    Como no cache, o último elemento da chave é a impressão digital da base: só o aquecimento
+    mais recente de cada nome é lembrado, e nenhum outro começa enquanto ele ainda roda
+    (durante uma carga a impressão digital muda a cada bloco gravado).
+    """
+    name, fingerprint = key[:-1], key[-1]
+    with _WARMUPS_LOCK:
+        previous = _WARMUPS.get(name)
+        if previous is not None and (previous[0] == fingerprint or previous[1].is_alive()):
+            return None
+        thread = threading.Thread(target=target, name='aquecimento', daemon=True)
+        _WARMUPS[name] = (fingerprint, thread)
+        thread.start()
+    return thread
+
+# Visões prontas por combinação de filtros (KPIs e tabelas) e seções já abertas (figuras em JSON)
+VIEW_CACHE = FrameCache(max_bytes=CACHE_BYTES, max_entries=int(os.environ.get('IFOOD_VIEW_CACHE_SIZE', '64')))
@@ -1,25 +1,193 @@
 import sqlite3
 import pandas as pd
 import numpy as np
-from faker import Faker
-import random
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
-fake = Faker('pt_BR')
+from name_pool import NamePool
+from rollups import drop_rollups, refresh_rollups, refresh_sketches, start_generation
+
+CATEGORIAS = np.array(['Brasileira', 'Italiana', 'Japonesa', 'Mexicana', 'Árabe',
+                       'Fast Food', 'Pizza', 'Hambúrguer', 'Saudável', 'Doces'])
+CIDADES = np.array(['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Salvador',
+                    'Brasília', 'Fortaleza', 'Recife', 'Porto Alegre'])
+SEGMENTOS = np.array(['Premium', 'Regular', 'Ocasional', 'Novo'])
+GENEROS = np.array(['M', 'F'])
+STATUS = np.array(['Entregue', 'Cancelado', 'Em andamento'])
+VEICULOS = np.array(['Moto', 'Bicicleta', 'Carro'])
+CITY_CODES = {cidade: code for code, cidade in enumerate(CIDADES.tolist())}
+
+# Colunas geradas como códigos (índices nos vocabulários acima); no schema 'default' são
+# gravadas como texto e no schema 'analytics' como <coluna>_id (código + 1) das tabelas dim_*
+CODED_COLUMNS = {'categoria': CATEGORIAS, 'cidade': CIDADES, 'status': STATUS}
+
+# Perfis de carga: PRAGMAs do SQLite e se os índices são criados só depois da carga.
+# WAL (persistente no arquivo) deixa dashboards e relatórios lendo enquanto o gerador grava
+BULK_LOAD_PROFILES = {
+    'default': {'journal_mode': 'WAL', 'synchronous': 'FULL', 'cache_size': -2000, 'defer_indexes': False},
+    'bulk': {'journal_mode': 'OFF', 'synchronous': 'OFF', 'cache_size': -262144, 'defer_indexes': True}
+}
+
+INDEXES = {
+    'default': [
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_data ON pedidos (data_pedido)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_restaurante ON pedidos (restaurante_id)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_usuario ON pedidos (usuario_id)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_entregador ON pedidos (entregador_id)'
+    ],
+    'analytics': [
+        # Cobre KPIs por status e período sem tocar a tabela
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_status_data ON pedidos_base '
+        '(status_id, data_pedido, valor_pedido, tempo_entrega, avaliacao)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_data ON pedidos_base (data_pedido)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_restaurante ON pedidos_base (restaurante_id)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_usuario ON pedidos_base (usuario_id)',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_entregador ON pedidos_base (entregador_id)'
+    ]
+}
+
+# Schema analítico: códigos inteiros com tabelas de lookup, data_pedido em epoch (segundos)
+# e views com os nomes e colunas originais, para que dashboard e relatórios não mudem
+ANALYTICS_SCHEMA = '''
+CREATE TABLE dim_status (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+CREATE TABLE dim_categoria (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+CREATE TABLE dim_cidade (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+
+CREATE TABLE restaurantes_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    categoria_id INTEGER NOT NULL REFERENCES dim_categoria (id),
+    cidade_id INTEGER NOT NULL REFERENCES dim_cidade (id),
+    rating REAL,
+    tempo_medio_preparo INTEGER,
+    taxa_comissao REAL,
+    data_cadastro DATE
+);
+
+CREATE TABLE usuarios_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    cidade_id INTEGER NOT NULL REFERENCES dim_cidade (id),
+    data_cadastro DATE,
+    idade INTEGER,
+    genero TEXT,
+    segmento TEXT
+);
+
+CREATE TABLE pedidos_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    restaurante_id INTEGER REFERENCES restaurantes_base (id),
+    usuario_id INTEGER REFERENCES usuarios_base (id),
+    valor_pedido REAL,
+    taxa_entrega REAL,
+    tempo_entrega INTEGER,
+    status_id INTEGER REFERENCES dim_status (id),
+    data_pedido INTEGER,
+    avaliacao INTEGER,
+    entregador_id INTEGER REFERENCES entregadores_base (id)
+);
+
+CREATE TABLE entregadores_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    cidade_id INTEGER NOT NULL REFERENCES dim_cidade (id),
+    veiculo TEXT,
+    rating REAL,
+    entregas_realizadas INTEGER,
+    data_cadastro DATE
+);
+
+CREATE VIEW restaurantes AS
+SELECT r.id, r.nome, c.nome AS categoria, d.nome AS cidade, r.rating,
+       r.tempo_medio_preparo, r.taxa_comissao, r.data_cadastro
+FROM restaurantes_base r
+JOIN dim_categoria c ON c.id = r.categoria_id
+JOIN dim_cidade d ON d.id = r.cidade_id;
+
+CREATE VIEW usuarios AS
+SELECT u.id, u.nome, d.nome AS cidade, u.data_cadastro, u.idade, u.genero, u.segmento
+FROM usuarios_base u
+JOIN dim_cidade d ON d.id = u.cidade_id;
+
+CREATE VIEW pedidos AS
+SELECT p.id, p.restaurante_id, p.usuario_id, p.valor_pedido, p.taxa_entrega, p.tempo_entrega,
+       s.nome AS status, strftime('%Y-%m-%dT%H:%M:%S', p.data_pedido, 'unixepoch') AS data_pedido,
+       p.avaliacao, p.entregador_id
+FROM pedidos_base p
+LEFT JOIN dim_status s ON s.id = p.status_id;
+
+CREATE VIEW entregadores AS
+SELECT e.id, e.nome, d.nome AS cidade, e.veiculo, e.rating, e.entregas_realizadas, e.data_cadastro
+FROM entregadores_base e
+JOIN dim_cidade d ON d.id = e.cidade_id;
+'''
+
+LOOKUP_TABLES = {'dim_status': STATUS, 'dim_categoria': CATEGORIAS, 'dim_cidade': CIDADES}
+
+# Cópia de uma base 'default' (tabelas renomeadas para *_legado) para o schema analítico
+MIGRATION_INSERTS = [
+    '''INSERT OR IGNORE INTO dim_status (nome) SELECT DISTINCT status FROM pedidos_legado WHERE status IS NOT NULL''',
+    '''INSERT OR IGNORE INTO dim_categoria (nome) SELECT DISTINCT categoria FROM restaurantes_legado''',
+    '''INSERT OR IGNORE INTO dim_cidade (nome)
+       SELECT cidade FROM restaurantes_legado UNION SELECT cidade FROM usuarios_legado
+       UNION SELECT cidade FROM entregadores_legado''',
+    '''INSERT INTO restaurantes_base
+       SELECT r.id, r.nome, c.id, d.id, r.rating, r.tempo_medio_preparo, r.taxa_comissao, r.data_cadastro
+       FROM restaurantes_legado r
+       JOIN dim_categoria c ON c.nome = r.categoria
+       JOIN dim_cidade d ON d.nome = r.cidade
+       ORDER BY r.id''',
+    '''INSERT INTO usuarios_base
+       SELECT u.id, u.nome, d.id, u.data_cadastro, u.idade, u.genero, u.segmento
+       FROM usuarios_legado u
+       JOIN dim_cidade d ON d.nome = u.cidade
+       ORDER BY u.id''',
+    '''INSERT INTO entregadores_base
+       SELECT e.id, e.nome, d.id, e.veiculo, e.rating, e.entregas_realizadas, e.data_cadastro
+       FROM entregadores_legado e
+       JOIN dim_cidade d ON d.nome = e.cidade
+       ORDER BY e.id''',
+    '''INSERT INTO pedidos_base
+       SELECT p.id, p.restaurante_id, p.usuario_id, p.valor_pedido, p.taxa_entrega, p.tempo_entrega,
+              s.id, CAST(strftime('%s', p.data_pedido) AS INTEGER), p.avaliacao, p.entregador_id
+       FROM pedidos_legado p
+       LEFT JOIN dim_status s ON s.nome = p.status
+       ORDER BY p.id'''
+]
+
+def detect_schema(conn):
+    """Identifica o schema de uma base existente ('analytics' se houver pedidos_base)"""
+    found = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pedidos_base'").fetchone()
+    return 'analytics' if found else 'default'
 
 class DataGenerator:
-    def __init__(self, db_path='ifood_data.db'):
+    def __init__(self, db_path='ifood_data.db', seed=None, chunk_size=100_000, profile='default', reference_time=None,
+                 schema=None):
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        # Schema 'default' (texto) ou 'analytics'; sem indicação, segue o da base existente
+        self.schema = schema or detect_schema(self.conn)
+        # seed pode ser um inteiro ou uma SeedSequence derivada (modo multiprocesso)
+        self.rng = np.random.default_rng(seed)
+        self.names = NamePool.load()
+        # Data de referência fixa para que execuções com a mesma semente sejam reprodutíveis
+        self.reference_time = reference_time or datetime.now()
+        self.chunk_size = chunk_size
+        self.profile = BULK_LOAD_PROFILES[profile] if isinstance(profile, str) else {**BULK_LOAD_PROFILES['default'], **profile}
         
-    def create_tables(self):
-        """Cria as tabelas do banco de dados"""
+    def create_tables(self, targets=()):
+        """Cria as tabelas do banco de dados (targets: tamanhos da carga, que entram na geração da base)"""
         
-        # Limpar tabelas existentes
-        self.conn.execute('DROP TABLE IF EXISTS pedidos')
-        self.conn.execute('DROP TABLE IF EXISTS restaurantes')
-        self.conn.execute('DROP TABLE IF EXISTS usuarios')
-        self.conn.execute('DROP TABLE IF EXISTS entregadores')
+        # Limpar tabelas e views existentes (de qualquer um dos schemas)
+        self._drop_objects()
+        start_generation(self.conn, self._generation_key(targets))
+        
+        if self.schema == 'analytics':
+            self._create_analytics_tables()
+            return
         
         # Tabela de Restaurantes
         self.conn.execute('''
@@ -60,8 +228,10 @@ class DataGenerator:
             status TEXT,
             data_pedido DATETIME,
             avaliacao INTEGER,
+            entregador_id INTEGER,
             FOREIGN KEY (restaurante_id) REFERENCES restaurantes (id),
-            FOREIGN KEY (usuario_id) REFERENCES usuarios (id)
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id),
+            FOREIGN KEY (entregador_id) REFERENCES entregadores (id)
         )
         ''')
         
@@ -78,129 +248,553 @@ class DataGenerator:
         )
         ''')
         
+        if not self.profile['defer_indexes']:
+            self.create_indexes()
+        
+        self.conn.commit()
+    
+    def _drop_objects(self):
+        """Remove tabelas e views dos dois schemas"""
+        objects = dict(self.conn.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view')"))
+        for name in ('pedidos', 'restaurantes', 'usuarios', 'entregadores',
+                     'pedidos_base', 'restaurantes_base', 'usuarios_base', 'entregadores_base', *LOOKUP_TABLES):
+            if name in objects:
+                self.conn.execute(f"DROP {objects[name].upper()} {name}")
+        drop_rollups(self.conn)
+    
+    def _generation_key(self, targets):
+        """Identidade da carga: semente (entropia do gerador), data de referência, schema e tamanhos"""
+        seed_seq = self.rng.bit_generator.seed_seq
+        return repr((seed_seq.entropy, seed_seq.spawn_key, self.reference_time.isoformat(), self.schema, tuple(targets)))
+    
+    def _create_analytics_tables(self):
+        """Cria o schema analítico: lookups, tabelas base e views compatíveis"""
+        self._execute_script(ANALYTICS_SCHEMA)
+        self._fill_lookups()
+        if not self.profile['defer_indexes']:
+            self.create_indexes()
         self.conn.commit()
+    
+    def _execute_script(self, script):
+        """Executa um script DDL dentro da transação corrente (executescript faria COMMIT antes)"""
+        for statement in script.split(';'):
+            if statement.strip():
+                self.conn.execute(statement)
+    
+    def migrate_to_analytics(self):
+        """Converte uma base no schema 'default' para o schema analítico, preservando os dados"""
+        if detect_schema(self.conn) == 'analytics':
+            print("✅ A base já está no schema analítico")
+            return
         
-    def generate_restaurants(self, n=200):
-        """Gera dados fictícios de restaurantes"""
-        categorias = ['Brasileira', 'Italiana', 'Japonesa', 'Mexicana', 'Árabe', 
-                     'Fast Food', 'Pizza', 'Hambúrguer', 'Saudável', 'Doces']
-        cidades = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Salvador', 
-                  'Brasília', 'Fortaleza', 'Recife', 'Porto Alegre']
-        
-        restaurants = []
-        for i in range(n):
-            restaurant = (
-                f"Restaurante {fake.company()}",
-                random.choice(categorias),
-                random.choice(cidades),
-                round(random.uniform(3.0, 5.0), 1),
-                random.randint(15, 60),
-                round(random.uniform(0.15, 0.25), 2),
-                fake.date_between(start_date='-2y', end_date='today').isoformat()
-            )
-            restaurants.append(restaurant)
-            
-        self.conn.executemany('''
-            INSERT INTO restaurantes (nome, categoria, cidade, rating, tempo_medio_preparo, taxa_comissao, data_cadastro)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', restaurants)
+        print("🚀 Migrando a base para o schema analítico...")
+        start = time.perf_counter()
+        self._ensure_courier_column()
         
+        # Tudo em uma única transação: em caso de erro, a base original permanece intacta
+        self.conn.execute('BEGIN')
+        for table in ('restaurantes', 'usuarios', 'pedidos', 'entregadores'):
+            self.conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legado")
+        self._execute_script(ANALYTICS_SCHEMA)
+        self._fill_lookups()
+        for statement in MIGRATION_INSERTS:
+            self.conn.execute(statement)
+        for table in ('pedidos', 'restaurantes', 'usuarios', 'entregadores'):
+            self.conn.execute(f"DROP TABLE {table}_legado")
         self.conn.commit()
-        print(f"✅ {n} restaurantes gerados")
+        
+        self.schema = 'analytics'
+        self.create_indexes()
+        self.refresh_rollups()
+        print(f"✅ Migração concluída em {time.perf_counter() - start:.1f}s")
     
-    def generate_users(self, n=5000):
-        """Gera dados fictícios de usuários"""
-        cidades = ['São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Salvador', 
-                  'Brasília', 'Fortaleza', 'Recife', 'Porto Alegre']
-        segmentos = ['Premium', 'Regular', 'Ocasional', 'Novo']
-        
-        users = []
-        for i in range(n):
-            user = (
-                fake.name(),
-                random.choice(cidades),
-                fake.date_between(start_date='-2y', end_date='today').isoformat(),
-                random.randint(18, 65),
-                random.choice(['M', 'F']),
-                random.choice(segmentos)
-            )
-            users.append(user)
-            
-        self.conn.executemany('''
-            INSERT INTO usuarios (nome, cidade, data_cadastro, idade, genero, segmento)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', users)
+    def _fill_lookups(self):
+        """Popula as tabelas dim_* com os vocabulários (id = posição + 1)"""
+        for table, values in LOOKUP_TABLES.items():
+            self.conn.executemany(f"INSERT OR IGNORE INTO {table} (id, nome) VALUES (?, ?)",
+                                  enumerate(values.tolist(), start=1))
+    
+    def _storage(self, table):
+        """Tabela física onde as linhas de uma tabela lógica são gravadas"""
+        return f"{table}_base" if self.schema == 'analytics' else table
         
-        self.conn.commit()
-        print(f"✅ {n} usuários gerados")
+    def generate_restaurants(self, n=200, first_id=None, signup_days=730):
+        """Gera dados fictícios de restaurantes"""
+        rows, elapsed = self._load('restaurantes', self._with_ids(self._restaurant_chunks(n, signup_days), first_id))
+        print(f"✅ {rows:,} restaurantes gerados ({self._rate(rows, elapsed)})")
     
-    def generate_orders(self, n=20000):
+    def generate_users(self, n=5000, first_id=None, signup_days=730):
+        """Gera dados fictícios de usuários"""
+        rows, elapsed = self._load('usuarios', self._with_ids(self._user_chunks(n, signup_days), first_id))
+        print(f"✅ {rows:,} usuários gerados ({self._rate(rows, elapsed)})")
+    
+    def generate_couriers(self, per_city=50, signup_days=730):
+        """Gera dados fictícios de entregadores (per_city em cada cidade)"""
+        rows, elapsed = self._load('entregadores', self._courier_chunks(per_city * len(CIDADES), signup_days))
+        print(f"✅ {rows:,} entregadores gerados ({self._rate(rows, elapsed)})")
+    
+    def generate_orders(self, n=20000, first_id=None, inputs=None, span_days=366):
         """Gera dados fictícios de pedidos"""
-        # Obter IDs de restaurantes e usuários
-        restaurant_ids = [row[0] for row in self.conn.execute('SELECT id FROM restaurantes').fetchall()]
-        user_ids = [row[0] for row in self.conn.execute('SELECT id FROM usuarios').fetchall()]
+        inputs = inputs or self.order_inputs()
+        rows, elapsed = self._load('pedidos', self._with_ids(self._order_chunks(n, inputs, span_days), first_id))
+        print(f"✅ {rows:,} pedidos gerados ({self._rate(rows, elapsed)})")
+    
+    def order_inputs(self):
+        """Lê do banco os ids usados pelos pedidos: restaurantes (e suas cidades), usuários e entregadores por cidade"""
+        restaurants = self.conn.execute('SELECT id, cidade FROM restaurantes ORDER BY id').fetchall()
+        couriers = self.conn.execute('SELECT id, cidade FROM entregadores ORDER BY id').fetchall()
         
-        status_options = ['Entregue', 'Cancelado', 'Em andamento']
+        # Entregadores agrupados por cidade: ids ordenados por cidade + deslocamento e quantidade de cada cidade
+        courier_ids = np.array([row[0] for row in couriers], dtype=np.int64)
+        courier_cities = np.array([CITY_CODES[row[1]] for row in couriers], dtype=np.int64)
+        order = np.argsort(courier_cities, kind='stable')
+        counts = np.bincount(courier_cities, minlength=len(CIDADES))
         
-        orders = []
-        for i in range(n):
-            # Gera data aleatória nos últimos 365 dias
-            base_date = datetime.now() - timedelta(days=random.randint(0, 365))
-            status = random.choice(status_options)
+        return {
+            'restaurant_ids': np.array([row[0] for row in restaurants], dtype=np.int64),
+            'restaurant_cities': np.array([CITY_CODES[row[1]] for row in restaurants], dtype=np.int64),
+            'user_ids': np.fromiter((row[0] for row in self.conn.execute('SELECT id FROM usuarios')), dtype=np.int64),
+            'courier_ids': courier_ids[order],
+            'courier_offsets': np.concatenate(([0], np.cumsum(counts)[:-1])),
+            'courier_counts': counts
+        }
+    
+    def _chunk_sizes(self, n):
+        """Divide n linhas em blocos de no máximo chunk_size"""
+        for start in range(0, n, self.chunk_size):
+            yield min(self.chunk_size, n - start)
+    
+    def _random_dates(self, size, max_days):
+        """Datas (ISO) sorteadas entre hoje e max_days atrás"""
+        today = np.datetime64(self.reference_time.date(), 'D')
+        return np.datetime_as_string(today - self.rng.integers(0, max_days + 1, size).astype('timedelta64[D]'))
+    
+    def _restaurant_chunks(self, n, signup_days=730):
+        """Gera blocos de colunas de restaurantes"""
+        rng = self.rng
+        for size in self._chunk_sizes(n):
+            yield {
+                'nome': np.char.add('Restaurante ', self.names.company_names(rng, size)),
+                'categoria': rng.integers(0, len(CATEGORIAS), size),
+                'cidade': rng.integers(0, len(CIDADES), size),
+                'rating': np.round(rng.uniform(3.0, 5.0, size), 1),
+                'tempo_medio_preparo': rng.integers(15, 61, size),
+                'taxa_comissao': np.round(rng.uniform(0.15, 0.25, size), 2),
+                'data_cadastro': self._random_dates(size, signup_days)
+            }
+    
+    def _user_chunks(self, n, signup_days=730):
+        """Gera blocos de colunas de usuários"""
+        rng = self.rng
+        for size in self._chunk_sizes(n):
+            genero = rng.integers(0, len(GENEROS), size)
+            yield {
+                'nome': self.names.person_names(rng, size, female=GENEROS[genero] == 'F'),
+                'cidade': rng.integers(0, len(CIDADES), size),
+                'data_cadastro': self._random_dates(size, signup_days),
+                'idade': rng.integers(18, 66, size),
+                'genero': GENEROS[genero],
+                'segmento': SEGMENTOS[rng.integers(0, len(SEGMENTOS), size)]
+            }
+    
+    def _courier_chunks(self, n, signup_days=730):
+        """Gera blocos de colunas de entregadores, distribuídos igualmente entre as cidades"""
+        rng = self.rng
+        cidades = np.repeat(np.arange(len(CIDADES)), n // len(CIDADES))
+        for start in range(0, n, self.chunk_size):
+            cidade = cidades[start:start + self.chunk_size]
+            size = len(cidade)
+            yield {
+                'nome': self.names.person_names(rng, size),
+                'cidade': cidade,
+                'veiculo': VEICULOS[rng.integers(0, len(VEICULOS), size)],
+                'rating': np.round(rng.uniform(3.5, 5.0, size), 1),
+                'entregas_realizadas': np.zeros(size, dtype=np.int64),
+                'data_cadastro': self._random_dates(size, signup_days)
+            }
+    
+    def _with_ids(self, chunks, first_id):
+        """Acrescenta ids explícitos aos blocos (intervalos disjuntos no modo multiprocesso)"""
+        if first_id is None:
+            yield from chunks
+            return
+        for columns in chunks:
+            size = len(next(iter(columns.values())))
+            yield {'id': np.arange(first_id, first_id + size), **columns}
+            first_id += size
+    
+    def _order_chunks(self, n, inputs, span_days=366):
+        """Gera blocos de colunas de pedidos (vetorizado com NumPy)"""
+        rng = self.rng
+        now = np.datetime64(self.reference_time, 'us')
+        
+        for size in self._chunk_sizes(n):
+            status_idx = rng.integers(0, len(STATUS), size)
+            
+            # Gera datas aleatórias nos últimos span_days dias (365 dias de histórico por padrão)
+            data_pedido = now - rng.integers(0, span_days, size).astype('timedelta64[D]')
             
-            order = (
-                random.choice(restaurant_ids),
-                random.choice(user_ids),
-                round(random.uniform(20, 150), 2),
-                round(random.uniform(3, 12), 2),
-                random.randint(20, 90),
-                status,
-                base_date.isoformat(),
-                random.randint(1, 5) if status == 'Entregue' and random.random() > 0.1 else None
-            )
-            orders.append(order)
+            # Avaliação apenas para ~90% dos pedidos entregues
+            com_avaliacao = (status_idx == 0) & (rng.random(size) > 0.1)
+            avaliacao = np.full(size, None, dtype=object)
+            avaliacao[com_avaliacao] = rng.integers(1, 6, int(com_avaliacao.sum()))
             
-        self.conn.executemany('''
-            INSERT INTO pedidos (restaurante_id, usuario_id, valor_pedido, taxa_entrega, tempo_entrega, status, data_pedido, avaliacao)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', orders)
+            restaurant_idx = rng.integers(0, len(inputs['restaurant_ids']), size)
+            
+            yield {
+                'restaurante_id': inputs['restaurant_ids'][restaurant_idx],
+                'usuario_id': rng.choice(inputs['user_ids'], size),
+                'valor_pedido': np.round(rng.uniform(20, 150, size), 2),
+                'taxa_entrega': np.round(rng.uniform(3, 12, size), 2),
+                'tempo_entrega': rng.integers(20, 91, size),
+                'status': status_idx,
+                'data_pedido': data_pedido,
+                'avaliacao': avaliacao,
+                'entregador_id': self._assign_couriers(inputs, inputs['restaurant_cities'][restaurant_idx], status_idx == 0)
+            }
+    
+    def _assign_couriers(self, inputs, cities, delivered):
+        """Sorteia, para cada pedido entregue, um entregador da cidade do restaurante (vetorizado por cidade)"""
+        counts = inputs['courier_counts'][cities]
+        assigned = delivered & (counts > 0)
+        positions = inputs['courier_offsets'][cities] + (self.rng.random(len(cities)) * counts).astype(np.int64)
         
+        entregador_id = np.full(len(cities), None, dtype=object)
+        entregador_id[assigned] = inputs['courier_ids'][positions[assigned]]
+        return entregador_id
+    
+    def update_courier_deliveries(self, after_id=None):
+        """Recalcula entregas_realizadas com uma única agregação sobre os pedidos.
+        
+        Com after_id (modo --append), só os pedidos com id acima dele são agregados e somados
+        aos contadores: o custo acompanha o lote novo, não o histórico.
+        """
+        entregadores, pedidos = self._storage('entregadores'), self._storage('pedidos')
+        if after_id is None:
+            self.conn.execute(f'UPDATE {entregadores} SET entregas_realizadas = 0')
+            after_id = 0
+        self.conn.execute(f'''
+            UPDATE {entregadores}
+            SET entregas_realizadas = COALESCE(entregas_realizadas, 0) + novas.entregas
+            FROM (SELECT entregador_id, COUNT(*) AS entregas
+                  FROM {pedidos}
+                  WHERE id > ? AND entregador_id IS NOT NULL
+                  GROUP BY entregador_id) AS novas
+            WHERE {entregadores}.id = novas.entregador_id
+        ''', (after_id,))
         self.conn.commit()
-        print(f"✅ {n} pedidos gerados")
     
-    def generate_all_data(self):
+    def _load(self, table, chunks):
+        """Insere os blocos gerados um a um, mantendo a memória limitada ao tamanho do bloco"""
+        rows = 0
+        start = time.perf_counter()
+        for columns in chunks:
+            self._insert_columns(self._storage(table), self._encode(columns))
+            self.conn.commit()
+            rows += len(next(iter(columns.values())))
+        return rows, time.perf_counter() - start
+    
+    @staticmethod
+    def _rate(rows, elapsed):
+        return f"{rows / elapsed:,.0f} linhas/s" if elapsed > 0 else "-"
+    
+    def _encode(self, columns):
+        """Converte as colunas geradas (códigos e datetime64) para o formato de armazenamento do schema"""
+        encoded = {}
+        for name, values in columns.items():
+            if name in CODED_COLUMNS:
+                if self.schema == 'analytics':
+                    encoded[f"{name}_id"] = values + 1
+                else:
+                    encoded[name] = CODED_COLUMNS[name][values]
+            elif name == 'data_pedido':
+                if self.schema == 'analytics':
+                    encoded[name] = values.astype('datetime64[s]').astype(np.int64)
+                else:
+                    encoded[name] = np.datetime_as_string(values, unit='us')
+            else:
+                encoded[name] = values
+        return encoded
+    
+    def _insert_columns(self, table, columns):
+        """Insere colunas (arrays NumPy) em lote, alimentando o SQLite linha a linha sob demanda"""
+        names = list(columns)
+        sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        # tolist() converte para tipos nativos do Python; zip() entrega as linhas sem materializar uma lista
+        self.conn.executemany(sql, zip(*(np.asarray(values).tolist() for values in columns.values())))
+    
+    def apply_profile(self):
+        """Aplica os PRAGMAs do perfil de carga"""
+        for pragma in ('journal_mode', 'synchronous', 'cache_size'):
+            self.conn.execute(f"PRAGMA {pragma} = {self.profile[pragma]}")
+    
+    def restore_profile(self):
+        """Volta aos PRAGMAs seguros após uma carga em massa"""
+        for pragma in ('journal_mode', 'synchronous'):
+            self.conn.execute(f"PRAGMA {pragma} = {BULK_LOAD_PROFILES['default'][pragma]}")
+    
+    def create_indexes(self):
+        """Cria os índices da base (após a carga, quando o perfil adia sua criação)"""
+        for ddl in INDEXES[self.schema]:
+            self.conn.execute(ddl)
+        self.conn.commit()
+    
+    def generate_all_data(self, n_restaurants=200, n_users=5000, n_orders=20000, couriers_per_city=50):
         """Gera todos os dados fictícios"""
         print("🚀 Iniciando geração de dados do iFood...")
+        self.apply_profile()
+        
         print("Criando tabelas...")
-        self.create_tables()
+        self.create_tables((n_restaurants, n_users, n_orders, couriers_per_city))
         
         print("Gerando restaurantes...")
-        self.generate_restaurants()
+        self.generate_restaurants(n_restaurants)
         
         print("Gerando usuários...")
-        self.generate_users()
+        self.generate_users(n_users)
+        
+        print("Gerando entregadores...")
+        self.generate_couriers(couriers_per_city)
         
         print("Gerando pedidos...")
-        self.generate_orders()
+        self.generate_orders(n_orders)
+        
+        if self.profile['defer_indexes']:
+            print("Criando índices...")
+            self.create_indexes()
         
+        self.update_courier_deliveries()
+        self.refresh_rollups()
+        self.restore_profile()
         print("✅ Dados gerados com sucesso!")
         
         # Verificar dados criados
         restaurantes_count = self.conn.execute('SELECT COUNT(*) FROM restaurantes').fetchone()[0]
         usuarios_count = self.conn.execute('SELECT COUNT(*) FROM usuarios').fetchone()[0]
+        entregadores_count = self.conn.execute('SELECT COUNT(*) FROM entregadores').fetchone()[0]
         pedidos_count = self.conn.execute('SELECT COUNT(*) FROM pedidos').fetchone()[0]
         
         print(f"\n📊 Resumo dos dados gerados:")
         print(f"- Restaurantes: {restaurantes_count:,}")
         print(f"- Usuários: {usuarios_count:,}")
+        print(f"- Entregadores: {entregadores_count:,}")
         print(f"- Pedidos: {pedidos_count:,}")
         
+    def append_data(self, days=None, orders_per_day=None, n_restaurants=None, n_users=None, couriers_per_city=50):
+        """Acrescenta novos dias de pedidos (e novos usuários/restaurantes) sem recriar as tabelas"""
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+        if not {'restaurantes', 'usuarios', 'pedidos'} <= tables:
+            raise RuntimeError("Base não encontrada. Execute primeiro a geração completa (sem --append)")
+        
+        if self.schema == 'analytics':
+            # Consulta direto a tabela base (epoch indexado) em vez da view
+            first, last, total_orders = self.conn.execute(
+                "SELECT datetime(MIN(data_pedido), 'unixepoch'), datetime(MAX(data_pedido), 'unixepoch'), COUNT(*) "
+                "FROM pedidos_base"
+            ).fetchone()
+        else:
+            first, last, total_orders = self.conn.execute(
+                'SELECT MIN(data_pedido), MAX(data_pedido), COUNT(*) FROM pedidos'
+            ).fetchone()
+        if last is None:
+            raise RuntimeError("Tabela de pedidos vazia. Execute primeiro a geração completa (sem --append)")
+        first, last = datetime.fromisoformat(first), datetime.fromisoformat(last)
+        
+        # Por padrão, completa os dias entre o último pedido e a data de referência
+        if days is None:
+            days = (self.reference_time.date() - last.date()).days
+        if days <= 0:
+            print(f"✅ Base já atualizada até {last.date().isoformat()}. Nada a acrescentar.")
+            return
+        
+        # Mantém o ritmo diário do histórico: pedidos por dia observados e cadastros
+        # distribuídos uniformemente em 2 anos
+        if orders_per_day is None:
+            orders_per_day = round(total_orders / ((last.date() - first.date()).days + 1))
+        if n_restaurants is None:
+            n_restaurants = round(self.conn.execute('SELECT COUNT(*) FROM restaurantes').fetchone()[0] * days / 730)
+        if n_users is None:
+            n_users = round(self.conn.execute('SELECT COUNT(*) FROM usuarios').fetchone()[0] * days / 730)
+        
+        # Os pedidos novos herdam a hora do dia do último pedido; no dia de referência ela
+        # pode passar da data/hora de referência (ou de agora), então é limitada a ela
+        target = last + timedelta(days=days)
+        if target.date() == self.reference_time.date():
+            target = min(target, self.reference_time)
+        self.reference_time = target
+        print(f"🚀 Acrescentando {days} dia(s): {(last + timedelta(days=1)).date().isoformat()} "
+              f"a {self.reference_time.date().isoformat()}...")
+        
+        # Cada bloco é uma transação curta, para que os leitores continuem consultando a base
+        last_id = self.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self._storage('pedidos')}").fetchone()[0]
+        self.apply_profile()
+        self._upgrade_courier_schema(couriers_per_city)
+        self.create_indexes()
+        self.generate_restaurants(n_restaurants, signup_days=days - 1)
+        self.generate_users(n_users, signup_days=days - 1)
+        self.generate_orders(orders_per_day * days, span_days=days)
+        self.update_courier_deliveries(after_id=last_id)
+        self.refresh_rollups()
+        self.restore_profile()
+        print("✅ Dados acrescentados com sucesso!")
+    
+    def refresh_rollups(self):
+        """Atualiza o rollup diário e os sketches HLL do dashboard com os pedidos novos"""
+        start = time.perf_counter()
+        rows = refresh_rollups(self.conn)
+        print(f"✅ Rollup diário atualizado: {rows:,} pedidos agregados ({time.perf_counter() - start:.1f}s)")
+        start = time.perf_counter()
+        rows = refresh_sketches(self.conn)
+        print(f"✅ Sketches HLL de usuários e restaurantes atualizados: {rows:,} pedidos ({time.perf_counter() - start:.1f}s)")
+    
+    def _ensure_courier_column(self):
+        """Bases antigas: adiciona a coluna pedidos.entregador_id"""
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(pedidos)')}
+        if 'entregador_id' not in columns:
+            self.conn.execute('ALTER TABLE pedidos ADD COLUMN entregador_id INTEGER REFERENCES entregadores (id)')
+            self.conn.commit()
+    
+    def _upgrade_courier_schema(self, couriers_per_city):
+        """Bases antigas: adiciona pedidos.entregador_id e popula entregadores se estiver vazia"""
+        self._ensure_courier_column()
+        if self.conn.execute('SELECT COUNT(*) FROM entregadores').fetchone()[0] == 0:
+            self.generate_couriers(couriers_per_city)
+    
     def close(self):
         """Fecha a conexão com o banco"""
         self.conn.close()
 
-if __name__ == "__main__":
-    generator = DataGenerator()
-    generator.generate_all_data()
+def _id_ranges(n, workers):
+    """Divide 1..n em intervalos contíguos (primeiro id, quantidade), um por processo"""
+    bounds = [n * w // workers for w in range(workers + 1)]
+    return [(bounds[w] + 1, bounds[w + 1] - bounds[w]) for w in range(workers)]
+
+def _generate_shard(task):
+    """Processo de trabalho: gera intervalos disjuntos de ids em um arquivo de shard"""
+    shard_path, seed_seq, reference_time, chunk_size, schema, ranges, inputs = task
+    if os.path.exists(shard_path):
+        os.remove(shard_path)
+    
+    generator = DataGenerator(shard_path, seed=seed_seq, chunk_size=chunk_size,
+                              profile='bulk', reference_time=reference_time, schema=schema)
+    generator.apply_profile()
+    generator.create_tables()
+    generator.generate_users(ranges['usuarios'][1], first_id=ranges['usuarios'][0])
+    generator.generate_orders(ranges['pedidos'][1], first_id=ranges['pedidos'][0], inputs=inputs)
+    generator.close()
+    return shard_path
+
+def generate_sharded(db_path='ifood_data.db', workers=None, seed=0, n_restaurants=200, n_users=5000,
+                     n_orders=20000, chunk_size=100_000, reference_time=None, couriers_per_city=50,
+                     schema='default'):
+    """Gera a base em paralelo: cada processo grava um shard e os shards são mesclados em ordem.
+    
+    Restaurantes e entregadores (dimensões pequenas, necessárias a todos os processos para
+    ligar pedidos às cidades) são gerados antes, no processo principal. O resultado é
+    determinístico para a mesma semente, número de processos e data de referência.
+    """
+    workers = workers or os.cpu_count()
+    reference_time = reference_time or datetime.now()
+    totals = {'usuarios': n_users, 'pedidos': n_orders}
+    ranges = {table: _id_ranges(n, workers) for table, n in totals.items()}
+    seeds = np.random.SeedSequence(seed).spawn(workers + 1)
+    
+    # O WAL e o índice compartilhado da base antiga seriam aplicados sobre a nova
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    generator = DataGenerator(db_path, seed=seeds[0], chunk_size=chunk_size, profile='bulk',
+                              reference_time=reference_time, schema=schema)
+    generator.apply_profile()
+    generator.create_tables((n_restaurants, n_users, n_orders, couriers_per_city, workers))
+    generator.generate_restaurants(n_restaurants)
+    generator.generate_couriers(couriers_per_city)
+    
+    # Usuários ainda não existem na base: os processos sorteiam no intervalo global de ids
+    inputs = generator.order_inputs()
+    inputs['user_ids'] = np.arange(1, n_users + 1)
+    
+    print(f"🚀 Gerando {workers} shards em paralelo (semente {seed}, referência {reference_time.isoformat()})...")
+    tasks = [
+        (f"{db_path}.shard{w}", seeds[w + 1], reference_time, chunk_size, schema,
+         {table: ranges[table][w] for table in totals}, inputs)
+        for w in range(workers)
+    ]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shard_paths = list(executor.map(_generate_shard, tasks))
+    print(f"✅ Shards gerados em {time.perf_counter() - start:.1f}s")
+    
+    print("Mesclando shards...")
+    start = time.perf_counter()
+    for shard_path in shard_paths:
+        generator.conn.execute('ATTACH DATABASE ? AS shard', (shard_path,))
+        for table in ('usuarios', 'pedidos'):
+            storage = generator._storage(table)
+            generator.conn.execute(f'INSERT INTO {storage} SELECT * FROM shard.{storage} ORDER BY id')
+        generator.conn.commit()
+        generator.conn.execute('DETACH DATABASE shard')
+        os.remove(shard_path)
+    
+    generator.create_indexes()
+    generator.update_courier_deliveries()
+    generator.refresh_rollups()
+    generator.restore_profile()
+    print(f"✅ Shards mesclados em {time.perf_counter() - start:.1f}s")
     generator.close()
-    print("\n🎉 Base de dados criada: ifood_data.db")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera a base fictícia do iFood")
+    parser.add_argument('--db', default='ifood_data.db', help="Caminho do banco SQLite")
+    parser.add_argument('--restaurantes', type=int, default=None,
+                        help="Restaurantes gerados (padrão 200; no modo --append, novos restaurantes)")
+    parser.add_argument('--usuarios', type=int, default=None,
+                        help="Usuários gerados (padrão 5000; no modo --append, novos usuários)")
+    parser.add_argument('--pedidos', type=int, default=20000)
+    parser.add_argument('--entregadores-por-cidade', type=int, default=50)
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Linhas geradas e inseridas por bloco")
+    parser.add_argument('--profile', choices=sorted(BULK_LOAD_PROFILES), default='default',
+                        help="Perfil de PRAGMAs da carga (bulk = journal/synchronous OFF e índices ao final)")
+    parser.add_argument('--seed', type=int, default=None, help="Semente para gerar dados reprodutíveis")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processos de geração em paralelo (0 = todos os núcleos)")
+    parser.add_argument('--reference-date', type=datetime.fromisoformat, default=None,
+                        help="Data/hora de referência (ISO) usada como 'hoje'; fixe-a para resultados idênticos")
+    parser.add_argument('--schema', choices=('default', 'analytics'), default=None,
+                        help="Layout da base: texto (default) ou analítico com códigos, epochs e índices cobrindo consultas")
+    parser.add_argument('--migrate-analytics', action='store_true',
+                        help="Converte a base existente para o schema analítico, preservando os dados")
+    parser.add_argument('--append', action='store_true',
+                        help="Acrescenta novos dias à base existente em vez de recriá-la")
+    parser.add_argument('--days', type=int, default=None,
+                        help="Dias acrescentados no modo --append (padrão: até a data de referência)")
+    parser.add_argument('--pedidos-por-dia', type=int, default=None,
+                        help="Pedidos por dia no modo --append (padrão: média do histórico)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.migrate_analytics:
+        generator = DataGenerator(args.db)
+        generator.migrate_to_analytics()
+        generator.close()
+    elif args.append:
+        generator = DataGenerator(args.db, seed=args.seed, chunk_size=args.chunk_size,
+                                  reference_time=args.reference_date)
+        generator.append_data(args.days, args.pedidos_por_dia, args.restaurantes, args.usuarios,
+                              args.entregadores_por_cidade)
+        generator.close()
+        print(f"\n🎉 Base de dados atualizada: {args.db}")
+    else:
+        n_restaurants = 200 if args.restaurantes is None else args.restaurantes
+        n_users = 5000 if args.usuarios is None else args.usuarios
+        if args.workers != 1:
+            generate_sharded(args.db, args.workers or None, args.seed or 0, n_restaurants, n_users,
+                             args.pedidos, args.chunk_size, args.reference_date, args.entregadores_por_cidade,
+                             args.schema or 'default')
+        else:
+            generator = DataGenerator(args.db, seed=args.seed, chunk_size=args.chunk_size, profile=args.profile,
+                                      reference_time=args.reference_date, schema=args.schema)
+            generator.generate_all_data(n_restaurants, n_users, args.pedidos, args.entregadores_por_cidade)
+            generator.close()
+        print(f"\n🎉 Base de dados criada: {args.db}")
@@ -0,0 +1,103 @@
+"""
+Pool de conexões somente leitura com a base SQLite, compartilhado entre reruns e sessões.
+
+Dashboard, modo ao vivo e relatórios só leem a base: as conexões são abertas por URI
+com mode=ro, mmap_size e cache_size ajustados, e devolvidas ao pool depois de cada
+consulta em vez de fechadas. Com a base em WAL (o gerador liga o modo ao carregar os
+dados), leitores não bloqueiam o escritor nem uns aos outros durante uma carga.
+
+immutable=1 não é usado: ele desliga o controle de alterações, e as conexões
+deixariam de ver os pedidos acrescentados pelo gerador. Se o arquivo da base for
+recriado (outro inode), as conexões ociosas da base antiga são descartadas.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# Conexões ociosas mantidas por base; pedidos acima disso abrem conexões extras, fechadas na devolução
+POOL_SIZE = int(os.environ.get('IFOOD_DB_POOL_SIZE', '8'))
+
+# Leituras por mmap (compartilhado pelo cache de páginas do sistema) e cache de páginas de cada conexão
+MMAP_MB = int(os.environ.get('IFOOD_SQLITE_MMAP_MB', '256'))
+CACHE_MB = int(os.environ.get('IFOOD_SQLITE_CACHE_MB', '32'))
+
+def _file_identity(db_path):
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+class ConnectionPool:
+    """Conexões somente leitura com uma base SQLite, reaproveitadas entre consultas"""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = []
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+        # Consultas rodam em threads do pool de renderização: a conexão não fica presa à thread que a abriu
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_MB * 2**20}")
+        conn.execute(f"PRAGMA cache_size = {-CACHE_MB * 1024}")
+        return conn
+
+    def acquire(self):
+        """Conexão ociosa do pool, ou uma nova se não houver"""
+        identity = _file_identity(self.db_path)
+        if identity is None:
+            raise sqlite3.OperationalError(f"Base não encontrada: {self.db_path}")
+        with self._lock:
+            if identity != self._identity:
+                # Base recriada: conexões abertas leem o arquivo antigo
+                stale, self._idle, self._identity = self._idle, [], identity
+            else:
+                stale = []
+            conn = self._idle.pop() if self._idle else None
+        for old in stale:
+            old.close()
+        return conn if conn is not None else self._connect()
+
+    def release(self, conn):
+        """Devolve a conexão ao pool (fecha se o pool estiver cheio ou a base tiver sido recriada)"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            keep = len(self._idle) < self.size and _file_identity(self.db_path) == self._identity
+            if keep:
+                self._idle.append(conn)
+        if not keep:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Conexão emprestada pelo bloco with"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Fecha as conexões ociosas"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(db_path):
+    """Pool compartilhado de uma base"""
+    key = os.path.abspath(db_path)
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(db_path)
+        return _POOLS[key]
@@ -1,13 +1,19 @@
 import pandas as pd
-import sqlite3
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+import db_pool
+import snapshot
+
 class ReportGenerator:
     def __init__(self, db_path='ifood_data.db'):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Conexão somente leitura do pool: relatórios podem rodar durante uma carga do gerador
+        self.pool = db_pool.get_pool(db_path)
+        self.conn = self.pool.acquire()
+        # Análise compartilhada pelos relatórios (Excel e insights), calculada uma única vez
+        self._analysis = None
         
     def generate_executive_summary(self):
         """Gera resumo executivo com principais métricas"""
@@ -26,8 +32,13 @@ class ReportGenerator:
         JOIN usuarios u ON p.usuario_id = u.id
         """
         
-        df = pd.read_sql(query, self.conn)
-        df['data_pedido'] = pd.to_datetime(df['data_pedido'])
+        snapshot_path = snapshot.default_path(self.db_path)
+        if snapshot.is_current(snapshot_path, self.conn):
+            # Snapshot Parquet atualizado: leitura colunar em vez do join linha a linha no SQLite
+            df = snapshot.load_orders(snapshot_path).rename(columns={'cidade': 'restaurante_cidade'})
+        else:
+            df = pd.read_sql(query, self.conn)
+            df['data_pedido'] = pd.to_datetime(df['data_pedido'])
         
         # Calcular métricas principais
         df_entregues = df[df['status'] == 'Entregue']
@@ -47,12 +58,112 @@ class ReportGenerator:
         
         return metrics, df, df_entregues
     
+    def analyze(self):
+        """Análise compartilhada por todos os formatos de saída: métricas e tabelas por categoria,
+        cidade, segmento, mês e top restaurantes, com os pedidos lidos uma única vez"""
+        if self._analysis is not None:
+            return self._analysis
+        
+        metrics, df, df_entregues = self.generate_executive_summary()
+        
+        # Performance por Categoria
+        category_performance = df_entregues.groupby('categoria', observed=True).agg({
+            'valor_pedido': ['sum', 'mean', 'count'],
+            'tempo_entrega': 'mean',
+            'avaliacao': 'mean',
+            'restaurante_id': 'nunique'
+        }).round(2)
+        
+        category_performance.columns = [
+            'Receita Total', 'Ticket Médio', 'Total Pedidos', 
+            'Tempo Médio Entrega', 'Rating Médio', 'Qtd Restaurantes'
+        ]
+        category_performance = category_performance.reset_index()
+        category_performance['Pedidos por Restaurante'] = (
+            category_performance['Total Pedidos'] / category_performance['Qtd Restaurantes']
+        ).round(1)
+        
+        # Performance por Cidade
+        city_performance = df_entregues.groupby('restaurante_cidade', observed=True).agg({
+            'valor_pedido': ['sum', 'mean', 'count'],
+            'tempo_entrega': 'mean',
+            'avaliacao': 'mean',
+            'restaurante_id': 'nunique',
+            'usuario_id': 'nunique'
+        }).round(2)
+        
+        city_performance.columns = [
+            'Receita Total', 'Ticket Médio', 'Total Pedidos',
+            'Tempo Médio Entrega', 'Rating Médio', 'Qtd Restaurantes', 'Qtd Usuários'
+        ]
+        city_performance = city_performance.reset_index()
+        city_performance.columns = ['Cidade'] + city_performance.columns[1:].tolist()
+        
+        # Segmentação de Usuários
+        user_segmentation = df_entregues.groupby('usuario_segmento', observed=True).agg({
+            'valor_pedido': ['sum', 'mean', 'count'],
+            'usuario_id': 'nunique'
+        }).round(2)
+        
+        user_segmentation.columns = ['Receita Total', 'Ticket Médio', 'Total Pedidos', 'Qtd Usuários']
+        user_segmentation = user_segmentation.reset_index()
+        user_segmentation['Pedidos por Usuário'] = (
+            user_segmentation['Total Pedidos'] / user_segmentation['Qtd Usuários']
+        ).round(1)
+        user_segmentation['% da Receita'] = (
+            user_segmentation['Receita Total'] / user_segmentation['Receita Total'].sum() * 100
+        ).round(1)
+        
+        # Análise Temporal
+        mes = df_entregues['data_pedido'].dt.to_period('M').rename('mes')
+        temporal_analysis = df_entregues.groupby(mes, observed=True).agg({
+            'valor_pedido': ['sum', 'mean', 'count'],
+            'tempo_entrega': 'mean',
+            'avaliacao': 'mean'
+        }).round(2)
+        
+        temporal_analysis.columns = [
+            'Receita Mensal', 'Ticket Médio', 'Total Pedidos',
+            'Tempo Médio Entrega', 'Rating Médio'
+        ]
+        temporal_analysis = temporal_analysis.reset_index()
+        temporal_analysis['mes'] = temporal_analysis['mes'].astype(str)
+        
+        # Calcular crescimento mês a mês
+        temporal_analysis['Crescimento Receita %'] = temporal_analysis['Receita Mensal'].pct_change() * 100
+        temporal_analysis['Crescimento Pedidos %'] = temporal_analysis['Total Pedidos'].pct_change() * 100
+        
+        # Top Restaurantes
+        top_restaurants = df_entregues.groupby(['restaurante_nome', 'categoria', 'restaurante_cidade'], observed=True).agg({
+            'valor_pedido': ['sum', 'mean', 'count'],
+            'tempo_entrega': 'mean',
+            'avaliacao': 'mean'
+        }).round(2)
+        
+        top_restaurants.columns = [
+            'Receita Total', 'Ticket Médio', 'Total Pedidos',
+            'Tempo Médio Entrega', 'Rating Médio'
+        ]
+        top_restaurants = top_restaurants.reset_index()
+        top_restaurants = top_restaurants.sort_values('Receita Total', ascending=False).head(20)
+        
+        self._analysis = {
+            'metrics': metrics,
+            'categoria': category_performance,
+            'cidade': city_performance,
+            'segmento': user_segmentation,
+            'temporal': temporal_analysis,
+            'top_restaurantes': top_restaurants
+        }
+        return self._analysis
+    
     def create_excel_report(self):
         """Cria relatório executivo em Excel"""
         
         print("Gerando relatório executivo...")
         
-        metrics, df, df_entregues = self.generate_executive_summary()
+        analysis = self.analyze()
+        metrics = analysis['metrics']
         
         # Criar arquivo Excel com múltiplas abas
         with pd.ExcelWriter('Relatorio_Executivo_iFood.xlsx', engine='openpyxl') as writer:
@@ -88,103 +199,20 @@ class ReportGenerator:
             summary_df = pd.DataFrame(summary_data)
             summary_df.to_excel(writer, sheet_name='Resumo Executivo', index=False)
             
-            # Aba 2: Performance por Categoria
-            category_performance = df_entregues.groupby('categoria').agg({
-                'valor_pedido': ['sum', 'mean', 'count'],
-                'tempo_entrega': 'mean',
-                'avaliacao': 'mean',
-                'restaurante_id': 'nunique'
-            }).round(2)
-            
-            category_performance.columns = [
-                'Receita Total', 'Ticket Médio', 'Total Pedidos', 
-                'Tempo Médio Entrega', 'Rating Médio', 'Qtd Restaurantes'
-            ]
-            category_performance = category_performance.reset_index()
-            category_performance['Pedidos por Restaurante'] = (
-                category_performance['Total Pedidos'] / category_performance['Qtd Restaurantes']
-            ).round(1)
-            
-            category_performance.to_excel(writer, sheet_name='Performance por Categoria', index=False)
-            
-            # Aba 3: Performance por Cidade
-            city_performance = df_entregues.groupby('restaurante_cidade').agg({
-                'valor_pedido': ['sum', 'mean', 'count'],
-                'tempo_entrega': 'mean',
-                'avaliacao': 'mean',
-                'restaurante_id': 'nunique',
-                'usuario_id': 'nunique'
-            }).round(2)
-            
-            city_performance.columns = [
-                'Receita Total', 'Ticket Médio', 'Total Pedidos',
-                'Tempo Médio Entrega', 'Rating Médio', 'Qtd Restaurantes', 'Qtd Usuários'
-            ]
-            city_performance = city_performance.reset_index()
-            city_performance.columns = ['Cidade'] + city_performance.columns[1:].tolist()
-            
-            city_performance.to_excel(writer, sheet_name='Performance por Cidade', index=False)
-            
-            # Aba 4: Segmentação de Usuários
-            user_segmentation = df_entregues.groupby('usuario_segmento').agg({
-                'valor_pedido': ['sum', 'mean', 'count'],
-                'usuario_id': 'nunique'
-            }).round(2)
-            
-            user_segmentation.columns = ['Receita Total', 'Ticket Médio', 'Total Pedidos', 'Qtd Usuários']
-            user_segmentation = user_segmentation.reset_index()
-            user_segmentation['Pedidos por Usuário'] = (
-                user_segmentation['Total Pedidos'] / user_segmentation['Qtd Usuários']
-            ).round(1)
-            user_segmentation['% da Receita'] = (
-                user_segmentation['Receita Total'] / user_segmentation['Receita Total'].sum() * 100
-            ).round(1)
-            
-            user_segmentation.to_excel(writer, sheet_name='Segmentação Usuários', index=False)
-            
-            # Aba 5: Análise Temporal
-            df_entregues['mes'] = df_entregues['data_pedido'].dt.to_period('M')
-            temporal_analysis = df_entregues.groupby('mes').agg({
-                'valor_pedido': ['sum', 'mean', 'count'],
-                'tempo_entrega': 'mean',
-                'avaliacao': 'mean'
-            }).round(2)
-            
-            temporal_analysis.columns = [
-                'Receita Mensal', 'Ticket Médio', 'Total Pedidos',
-                'Tempo Médio Entrega', 'Rating Médio'
-            ]
-            temporal_analysis = temporal_analysis.reset_index()
-            temporal_analysis['mes'] = temporal_analysis['mes'].astype(str)
-            
-            # Calcular crescimento mês a mês
-            temporal_analysis['Crescimento Receita %'] = temporal_analysis['Receita Mensal'].pct_change() * 100
-            temporal_analysis['Crescimento Pedidos %'] = temporal_analysis['Total Pedidos'].pct_change() * 100
-            
-            temporal_analysis.to_excel(writer, sheet_name='Análise Temporal', index=False)
-            
-            # Aba 6: Top Restaurantes
-            top_restaurants = df_entregues.groupby(['restaurante_nome', 'categoria', 'restaurante_cidade']).agg({
-                'valor_pedido': ['sum', 'mean', 'count'],
-                'tempo_entrega': 'mean',
-                'avaliacao': 'mean'
-            }).round(2)
-            
-            top_restaurants.columns = [
-                'Receita Total', 'Ticket Médio', 'Total Pedidos',
-                'Tempo Médio Entrega', 'Rating Médio'
-            ]
-            top_restaurants = top_restaurants.reset_index()
-            top_restaurants = top_restaurants.sort_values('Receita Total', ascending=False).head(20)
-            
-            top_restaurants.to_excel(writer, sheet_name='Top 20 Restaurantes', index=False)
+            # Abas 2 a 6: tabelas da análise compartilhada
+            analysis['categoria'].to_excel(writer, sheet_name='Performance por Categoria', index=False)
+            analysis['cidade'].to_excel(writer, sheet_name='Performance por Cidade', index=False)
+            analysis['segmento'].to_excel(writer, sheet_name='Segmentação Usuários', index=False)
+            analysis['temporal'].to_excel(writer, sheet_name='Análise Temporal', index=False)
+            analysis['top_restaurantes'].to_excel(writer, sheet_name='Top 20 Restaurantes', index=False)
         
         print("✅ Relatório Excel gerado: Relatorio_Executivo_iFood.xlsx")
         
     def create_insights_document(self):
         """Cria documento com insights e recomendações"""
         
-        metrics, df, df_entregues = self.generate_executive_summary()
+        analysis = self.analyze()
+        metrics = analysis['metrics']
         
         insights_content = f"""
 # 📊 RELATÓRIO DE INSIGHTS ESTRATÉGICOS - IFOOD
@@ -203,16 +231,16 @@ class ReportGenerator:
 ## 🔍 ANÁLISES PRINCIPAIS
 
 ### 1. Performance por Categoria
-{self._get_category_insights(df_entregues)}
+{self._get_category_insights(analysis['categoria'])}
 
 ### 2. Análise Geográfica
-{self._get_city_insights(df_entregues)}
+{self._get_city_insights(analysis['cidade'])}
 
 ### 3. Segmentação de Usuários
-{self._get_user_insights(df_entregues)}
+{self._get_user_insights(analysis['segmento'])}
 
 ### 4. Eficiência Operacional
-{self._get_operational_insights(df_entregues)}
+{self._get_operational_insights(metrics)}
 
 ## 💡 INSIGHTS ESTRATÉGICOS
 
@@ -272,15 +300,12 @@ Para análises mais detalhadas, consulte o dashboard interativo.
         
         print("✅ Documento de insights gerado: Insights_Estrategicos_iFood.md")
     
-    def _get_category_insights(self, df):
-        """Gera insights sobre categorias"""
-        category_perf = df.groupby('categoria').agg({
-            'valor_pedido': ['sum', 'mean', 'count']
-        })
-        category_perf.columns = ['receita', 'ticket_medio', 'pedidos']
+    def _get_category_insights(self, category_performance):
+        """Gera insights sobre categorias (tabela 'categoria' da análise)"""
+        category_perf = category_performance.set_index('categoria')
         
-        top_category = category_perf.sort_values('receita', ascending=False).index[0]
-        best_ticket = category_perf.sort_values('ticket_medio', ascending=False).index[0]
+        top_category = category_perf.sort_values('Receita Total', ascending=False).index[0]
+        best_ticket = category_perf.sort_values('Ticket Médio', ascending=False).index[0]
         
         return f"""
 - **Categoria Líder em Receita:** {top_category}
@@ -289,16 +314,13 @@ Para análises mais detalhadas, consulte o dashboard interativo.
 - **Oportunidade:** Categorias premium mostram potencial de crescimento
         """
     
-    def _get_city_insights(self, df):
-        """Gera insights sobre cidades"""
-        city_perf = df.groupby('restaurante_cidade').agg({
-            'valor_pedido': 'sum',
-            'restaurante_id': 'nunique'
-        })
-        city_perf['pedidos_por_restaurante'] = df.groupby('restaurante_cidade').size() / city_perf['restaurante_id']
+    def _get_city_insights(self, city_performance):
+        """Gera insights sobre cidades (tabela 'cidade' da análise)"""
+        city_perf = city_performance.set_index('Cidade')
+        pedidos_por_restaurante = city_perf['Total Pedidos'] / city_perf['Qtd Restaurantes']
         
-        top_city = city_perf.sort_values('valor_pedido', ascending=False).index[0]
-        best_efficiency = city_perf.sort_values('pedidos_por_restaurante', ascending=False).index[0]
+        top_city = city_perf.sort_values('Receita Total', ascending=False).index[0]
+        best_efficiency = pedidos_por_restaurante.sort_values(ascending=False).index[0]
         
         return f"""
 - **Cidade Líder em Receita:** {top_city}
@@ -307,15 +329,12 @@ Para análises mais detalhadas, consulte o dashboard interativo.
 - **Potencial de Expansão:** Cidades com alta demanda por restaurante
         """
     
-    def _get_user_insights(self, df):
-        """Gera insights sobre usuários"""
-        user_segments = df.groupby('usuario_segmento').agg({
-            'valor_pedido': ['sum', 'mean', 'count'],
-            'usuario_id': 'nunique'
-        })
+    def _get_user_insights(self, user_segmentation):
+        """Gera insights sobre usuários (tabela 'segmento' da análise)"""
+        user_segments = user_segmentation.set_index('usuario_segmento')
         
-        premium_revenue = user_segments.loc['Premium', ('valor_pedido', 'sum')] if 'Premium' in user_segments.index else 0
-        total_revenue = user_segments[('valor_pedido', 'sum')].sum()
+        premium_revenue = user_segments.loc['Premium', 'Receita Total'] if 'Premium' in user_segments.index else 0
+        total_revenue = user_segments['Receita Total'].sum()
         premium_pct = (premium_revenue / total_revenue * 100) if total_revenue > 0 else 0
         
         return f"""
@@ -325,10 +344,10 @@ Para análises mais detalhadas, consulte o dashboard interativo.
 - **Fidelização:** Programas específicos por segmento
         """
     
-    def _get_operational_insights(self, df):
-        """Gera insights operacionais"""
-        avg_delivery_time = df['tempo_entrega'].mean()
-        avg_rating = df['avaliacao'].mean()
+    def _get_operational_insights(self, metrics):
+        """Gera insights operacionais (médias dos pedidos entregues)"""
+        avg_delivery_time = metrics['tempo_medio_entrega']
+        avg_rating = metrics['rating_medio']
         
         return f"""
 - **Tempo Médio de Entrega:** {avg_delivery_time:.1f} minutos
@@ -338,15 +357,16 @@ Para análises mais detalhadas, consulte o dashboard interativo.
         """
     
     def close(self):
-        """Fecha conexão com banco"""
-        self.conn.close()
+        """Devolve a conexão ao pool"""
+        self.pool.release(self.conn)
 
 if __name__ == "__main__":
     print("🚀 Iniciando geração de relatórios...")
     
-    generator = ReportGenerator()
+    generator = None
     
     try:
+        generator = ReportGenerator()
         generator.create_excel_report()
         generator.create_insights_document()
         print("\n✅ Todos os relatórios foram gerados com sucesso!")
@@ -360,4 +380,5 @@ if __name__ == "__main__":
         print("Execute primeiro: python data_generator.py")
     
     finally:
-        generator.close()
+        if generator is not None:
+            generator.close()
@@ -0,0 +1,124 @@
+"""
+Modo ao vivo do dashboard: rollup diário e sketches HLL mantidos em memória e
+atualizados só com os pedidos novos.
+
+Na primeira consulta o estado parte das tabelas rollup_diario e rollup_sketch gravadas
+pelo gerador, cada uma a partir da sua marca d'água; a cada consulta seguinte, só pedidos
+com id acima da marca d'água são lidos do SQLite, agregados e somados ao estado. Nenhum
+pedido antigo é relido: sem rollups gravados, o modo ao vivo fica indisponível (poll
+devolve None) e o dashboard usa a visão comum. Como em data_cache, o estado vive em um módulo importado para
+ser compartilhado entre reruns e sessões do Streamlit.
+
+python live.py --db ifood_data.db faz o mesmo ciclo fora do dashboard.
+
+O estado vale para uma base: se o arquivo for recriado (outro inode) ou o gerador
+recriar as tabelas (outra geração), ele é descartado e recomeça do que estiver gravado.
+"""
+import argparse
+import threading
+import time
+
+import pandas as pd
+
+import db_pool
+import rollups
+
+class LiveTail:
+    """Rollup e sketches de uma base, atualizados incrementalmente a partir de uma marca d'água de id"""
+
+    def __init__(self, db_path, chunk_size=500_000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.watermark = None
+        self.sketch_watermark = None
+        self.identity = None
+        self.state = None
+        self.new_orders = 0
+        self.polled_at = None
+        self._lock = threading.Lock()
+
+    def _initialize(self, conn):
+        """Estado inicial das tabelas de rollup do gerador; falso se não houver rollup ou sketches gravados.
+
+        As duas tabelas podem estar em marcas d'água diferentes (uma carga entre refresh_rollups
+        e refresh_sketches): cada uma segue a partir da sua, sem reagregar o histórico.
+        """
+        if not (rollups.rollups_available(conn) and rollups.sketches_available(conn)):
+            self.state = None
+            return False
+        self.state = (pd.read_sql('SELECT * FROM rollup_diario', conn),
+                      pd.read_sql('SELECT * FROM rollup_sketch', conn))
+        self.watermark = rollups.rollup_watermark(conn)
+        self.sketch_watermark = rollups.rollup_watermark(conn, 'ultimo_pedido_id_sketch')
+        return True
+
+    def poll(self):
+        """Agrega os pedidos com id acima da marca d'água; devolve quantos pedidos novos entraram (None sem rollups)"""
+        # Marcas d'água, tabelas de rollup e pedidos novos lidos no mesmo instantâneo: um refresh_rollups
+        # concorrente não entra pela metade (pedidos contados no estado gravado e de novo na cauda)
+        with self._lock, db_pool.get_pool(self.db_path).connection() as conn, rollups._read_snapshot(conn):
+            max_id = conn.execute(
+                f"SELECT COALESCE(MAX(id), 0) FROM {rollups._orders_table(conn)}"
+            ).fetchone()[0]
+            # Base recriada (outro arquivo, outra geração ou marca d'água acima do maior id):
+            # recomeça do estado gravado
+            identity = (db_pool._file_identity(self.db_path), rollups.database_generation(conn))
+            if (self.state is None or identity != self.identity
+                    or max_id < max(self.watermark, self.sketch_watermark)):
+                self.identity = identity
+                if not self._initialize(conn):
+                    return None
+
+            watermark = self.watermark
+            if max_id > min(watermark, self.sketch_watermark):
+                rollup, sketches = self.state
+                novos = pd.read_sql(rollups.ROLLUP_QUERY, conn, params=(watermark, max_id))
+                for chunk in pd.read_sql(rollups.SKETCH_QUERY, conn, params=(self.sketch_watermark, max_id),
+                                         chunksize=self.chunk_size):
+                    sketches = rollups.merge_sketches(sketches, chunk)
+                # Uma única atribuição: leitores concorrentes veem o estado antigo ou o novo, nunca metade
+                self.state = (rollups.merge_rollup(rollup, novos), sketches)
+                self.watermark = self.sketch_watermark = max_id
+            self.new_orders = max_id - watermark
+            self.polled_at = time.time()
+        return self.new_orders
+
+    def aggregates(self, filters=None):
+        """KPIs e tabelas dos gráficos do estado atual (contagens distintas pelos sketches HLL)"""
+        filters = filters or {}
+        rollup, sketches = self.state
+        return rollups.aggregates_from_rollup(
+            rollups.filter_rollup(rollup, filters),
+            rollups.distinct_from_sketches(rollups.filter_rollup(sketches, filters))
+        )
+
+_TAILS = {}
+_TAILS_LOCK = threading.Lock()
+
+def get_tail(db_path):
+    """Estado ao vivo compartilhado de uma base"""
+    with _TAILS_LOCK:
+        if db_path not in _TAILS:
+            _TAILS[db_path] = LiveTail(db_path)
+        return _TAILS[db_path]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Acompanha os pedidos novos de uma base como o modo ao vivo do dashboard")
+    parser.add_argument('--db', default='ifood_data.db', help="Caminho do banco SQLite")
+    parser.add_argument('--ciclos', type=int, default=3, help="Consultas feitas antes de sair")
+    parser.add_argument('--intervalo', type=float, default=1.0, help="Segundos entre as consultas")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    tail = get_tail(args.db)
+    for ciclo in range(args.ciclos):
+        if ciclo:
+            time.sleep(args.intervalo)
+        novos = tail.poll()
+        if novos is None:
+            print("⚠️ A base não tem rollups gravados. Execute o data_generator.py para criá-los")
+            break
+        kpis = tail.aggregates()['kpis']
+        print(f"🔴 Até o pedido #{tail.watermark:,}: +{novos:,} novos, {kpis['total_pedidos']:,} pedidos, "
+              f"{kpis['usuarios_ativos']:,} usuários (HLL)")
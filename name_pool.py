@@ -0,0 +1,87 @@
+"""
+Pools de nomes pt_BR para síntese vetorizada de usuários e restaurantes.
+
+Os fragmentos (prenomes, sobrenomes, pronomes de tratamento e sufixos de empresa)
+vêm dos provedores pt_BR do Faker, são extraídos uma única vez e guardados em cache
+no disco. Os nomes são montados por indexação vetorizada com NumPy, sem chamar
+fake.name() / fake.company() por linha.
+"""
+import json
+import os
+
+import faker
+import numpy as np
+from faker.providers.company.pt_BR import Provider as CompanyProvider
+from faker.providers.person.pt_BR import Provider as PersonProvider
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+class NamePool:
+    def __init__(self, fragments):
+        self.first_names_female = np.array(fragments['first_names_female'])
+        self.first_names_male = np.array(fragments['first_names_male'])
+        self.last_names = np.array(fragments['last_names'])
+        self.prefixes_female = np.array(fragments['prefixes_female'])
+        self.prefixes_male = np.array(fragments['prefixes_male'])
+        self.company_suffixes = np.array(fragments['company_suffixes'])
+
+    @staticmethod
+    def build_fragments():
+        """Extrai os fragmentos de nomes dos provedores pt_BR do Faker"""
+        return {
+            'first_names_female': sorted(set(PersonProvider.first_names_female)),
+            'first_names_male': sorted(set(PersonProvider.first_names_male)),
+            'last_names': sorted(set(PersonProvider.last_names)),
+            'prefixes_female': list(PersonProvider.prefixes_female),
+            'prefixes_male': list(PersonProvider.prefixes_male),
+            'company_suffixes': list(CompanyProvider.company_suffixes)
+        }
+
+    @classmethod
+    def load(cls, cache_dir=CACHE_DIR):
+        """Carrega o pool do cache em disco, construindo-o na primeira execução"""
+        cache_path = os.path.join(cache_dir, f"name_pool_pt_BR_{faker.VERSION}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                return cls(json.load(f))
+
+        fragments = cls.build_fragments()
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(fragments, f, ensure_ascii=False)
+        return cls(fragments)
+
+    @staticmethod
+    def _pick(rng, values, size):
+        return values[rng.integers(0, len(values), size)]
+
+    def person_names(self, rng, size, female=None):
+        """Nomes completos no formato pt_BR: [pronome] prenome sobrenome [sobrenome]"""
+        if female is None:
+            female = rng.random(size) < 0.5
+
+        first = np.where(female,
+                         self._pick(rng, self.first_names_female, size),
+                         self._pick(rng, self.first_names_male, size))
+        names = np.char.add(np.char.add(first, ' '), self._pick(rng, self.last_names, size))
+
+        # Metade dos nomes recebe um segundo sobrenome, ampliando as combinações distintas
+        second_last = rng.random(size) < 0.5
+        names = np.where(second_last, np.char.add(np.char.add(names, ' '), self._pick(rng, self.last_names, size)), names)
+
+        # Como no Faker pt_BR, 1 em cada 6 nomes leva pronome de tratamento
+        prefix = np.where(female,
+                          self._pick(rng, self.prefixes_female, size),
+                          self._pick(rng, self.prefixes_male, size))
+        with_prefix = rng.random(size) < 1 / 6
+        return np.where(with_prefix, np.char.add(np.char.add(prefix, ' '), names), names)
+
+    def company_names(self, rng, size):
+        """Razões sociais no formato do Faker pt_BR (sobrenome[s] e sufixo opcional)"""
+        first = self._pick(rng, self.last_names, size)
+        second = np.char.add(np.char.add(first, ' '), self._pick(rng, self.last_names, size))
+        suffix = np.char.add(' ', self._pick(rng, self.company_suffixes, size))
+
+        # Formatos equiprováveis: "{sobrenome} {sufixo}", "{sobrenome} {sobrenome} {sufixo}", "{sobrenome}" (2x)
+        fmt = rng.integers(0, 4, size)
+        return np.select([fmt == 0, fmt == 1], [np.char.add(first, suffix), np.char.add(second, suffix)], first)
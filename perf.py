@@ -0,0 +1,132 @@
+"""
+Instrumentação do caminho crítico do dashboard.
+
+Cada rerun do Streamlit abre um Trace; as etapas marcadas com stage() ou @timed
+registram duração e variação de memória (RSS do processo) no Trace ativo. O Trace
+fica em uma ContextVar: tarefas enviadas a um pool de threads com submit() herdam o
+Trace de quem as enviou.
+
+Cada etapa também é emitida como uma linha JSON no logger 'ifood.perf'. Com
+IFOOD_PERF_LOG=1 as linhas vão para o stderr; sem isso o logger não tem handler e
+as linhas podem ser coletadas pela configuração de logging de quem roda o app.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger('ifood.perf')
+if os.environ.get('IFOOD_PERF_LOG') == '1' and not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def rss_bytes():
+    """Memória residente do processo (None fora do Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+class Trace:
+    """Etapas medidas em um rerun do dashboard"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, start, seconds, memory_delta, depth):
+        entry = {
+            'etapa': stage,
+            'nivel': depth,
+            'inicio_ms': round((start - self.started) * 1000, 2),
+            'ms': round(seconds * 1000, 2),
+            'memoria_mb': None if memory_delta is None else round(memory_delta / 2**20, 2),
+            'thread': threading.current_thread().name
+        }
+        with self._lock:
+            self.stages.append(entry)
+        logger.info(json.dumps({'evento': 'etapa', 'execucao': self.name, **entry}, ensure_ascii=False))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def finish(self):
+        """Emite a linha de resumo do rerun e devolve o tempo total em segundos"""
+        elapsed = self.elapsed
+        logger.info(json.dumps({
+            'evento': 'execucao', 'execucao': self.name,
+            'ms': round(elapsed * 1000, 2), 'etapas': len(self.stages), 'rss_mb': _mb(rss_bytes())
+        }, ensure_ascii=False))
+        return elapsed
+
+    def to_frame(self):
+        """Tabela das etapas em ordem de início para o painel de desempenho (etapas aninhadas recuadas)"""
+        df = pd.DataFrame(self.stages, columns=['etapa', 'nivel', 'inicio_ms', 'ms', 'memoria_mb', 'thread'])
+        df = df.sort_values('inicio_ms', kind='stable', ignore_index=True)
+        df['etapa'] = ['  ' * depth + name for name, depth in zip(df['etapa'], df['nivel'])]
+        return df.drop(columns='nivel').rename(columns={
+            'etapa': 'Etapa', 'inicio_ms': 'Início (ms)', 'ms': 'Tempo (ms)',
+            'memoria_mb': 'Δ Memória (MB)', 'thread': 'Thread'
+        })
+
+def _mb(nbytes):
+    return None if nbytes is None else round(nbytes / 2**20, 1)
+
+_current = contextvars.ContextVar('ifood_perf_trace', default=None)
+_depth = contextvars.ContextVar('ifood_perf_depth', default=0)
+
+def start_trace(name='dashboard'):
+    """Abre o Trace do rerun atual"""
+    trace = Trace(name)
+    _current.set(trace)
+    _depth.set(0)
+    return trace
+
+@contextmanager
+def stage(name):
+    """Mede a duração e a variação de RSS do bloco no Trace ativo (sem Trace, não faz nada)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    memory_before = rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        memory_after = rss_bytes()
+        _depth.reset(token)
+        delta = None if memory_before is None or memory_after is None else memory_after - memory_before
+        trace.record(name, start, seconds, delta, depth)
+
+def timed(name=None):
+    """Decorador: mede cada chamada do método ou função como uma etapa"""
+    def decorator(func):
+        label = name or func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def submit(pool, func, *args):
+    """pool.submit que leva o Trace (e o nível de aninhamento) para a thread do pool"""
+    return pool.submit(contextvars.copy_context().run, func, *args)
@@ -0,0 +1,566 @@
+"""
+Tabelas de rollup diário que alimentam os KPIs e gráficos do dashboard.
+
+rollup_diario guarda, por (dia, cidade, categoria, segmento, status), somas e contagens
+dos pedidos. Qualquer seleção de período/cidade/categoria é respondida somando essas
+linhas, então o custo depende de dias × dimensões e não do número de pedidos.
+A atualização é incremental: só pedidos com id acima da marca d'água são agregados.
+
+rollup_sketch guarda, no mesmo grão (com o status reduzido a entregue ou não), sketches
+HyperLogLog dos usuários e restaurantes: unidos, dão contagens distintas aproximadas
+para qualquer seleção sem percorrer os pedidos.
+"""
+import hashlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import hll
+
+ROLLUP_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS rollup_diario (
+        dia TEXT NOT NULL,
+        cidade TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        segmento TEXT NOT NULL,
+        status TEXT NOT NULL,
+        pedidos INTEGER NOT NULL,
+        receita REAL NOT NULL,
+        tempo_entrega_soma REAL NOT NULL,
+        avaliacao_soma REAL NOT NULL,
+        avaliacao_qtd INTEGER NOT NULL,
+        PRIMARY KEY (dia, cidade, categoria, segmento, status)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS rollup_sketch (
+        dia TEXT NOT NULL,
+        cidade TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        segmento TEXT NOT NULL,
+        entregue INTEGER NOT NULL,
+        usuarios BLOB NOT NULL,
+        restaurantes BLOB NOT NULL,
+        PRIMARY KEY (dia, cidade, categoria, segmento, entregue)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS rollup_estado (
+        chave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL
+    )'''
+]
+
+ROLLUP_TABLES = ('rollup_diario', 'rollup_sketch', 'rollup_estado')
+
+SKETCH_DIMENSIONS = ['dia', 'cidade', 'categoria', 'segmento', 'entregue']
+SKETCH_COLUMNS = SKETCH_DIMENSIONS + ['usuarios', 'restaurantes']
+
+def _orders_table(conn):
+    """Tabela física dos pedidos (pedidos_base no schema analítico)"""
+    found = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pedidos_base'").fetchone()
+    return 'pedidos_base' if found else 'pedidos'
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+def ensure_rollup_tables(conn):
+    for ddl in ROLLUP_SCHEMA:
+        conn.execute(ddl)
+    conn.commit()
+
+def drop_rollups(conn):
+    """Remove os rollups (chamado quando as tabelas de pedidos são recriadas)"""
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+def database_generation(conn):
+    """Geração da base (PRAGMA user_version): muda sempre que o gerador recria as tabelas; 0 em bases antigas"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def start_generation(conn, key):
+    """Marca a base com uma nova geração; rollups, snapshots e o modo ao vivo da geração anterior deixam de valer.
+
+    A geração é um hash de key (semente, data de referência e tamanhos da carga): execuções
+    com a mesma semente gravam o mesmo arquivo, e execuções diferentes, gerações diferentes.
+    """
+    generation = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=4).digest(), 'big') >> 1 or 1
+    conn.execute(f"PRAGMA user_version = {generation}")
+    return generation
+
+def rollup_watermark(conn, chave='ultimo_pedido_id'):
+    """Maior id de pedido já agregado (None se não houver rollups)"""
+    if not _table_exists(conn, 'rollup_estado'):
+        return None
+    row = conn.execute("SELECT valor FROM rollup_estado WHERE chave = ?", (chave,)).fetchone()
+    return row[0] if row else 0
+
+def rollups_available(conn, chave='ultimo_pedido_id'):
+    """Verdadeiro se há rollups gravados; pedidos acima da marca d'água são somados na consulta (load_rollup)"""
+    return bool(rollup_watermark(conn, chave))
+
+def sketches_available(conn):
+    """Verdadeiro se há sketches HLL gravados; pedidos acima da marca d'água são unidos na consulta"""
+    return _table_exists(conn, 'rollup_sketch') and rollups_available(conn, 'ultimo_pedido_id_sketch')
+
+@contextmanager
+def _read_snapshot(conn):
+    """Leituras no mesmo instantâneo da base: uma carga concorrente (rollup e marca d'água) não aparece pela metade"""
+    began = not conn.in_transaction
+    if began:
+        conn.execute('BEGIN')
+    try:
+        yield
+    finally:
+        if began:
+            conn.rollback()
+
+def _tail(conn, chave):
+    """Intervalo (marca d'água, max_id] dos pedidos ainda não agregados"""
+    watermark = rollup_watermark(conn, chave) or 0
+    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_orders_table(conn)}").fetchone()[0]
+    return watermark, max_id
+
+# Linhas de rollup_diario dos pedidos com id no intervalo (marca d'água, max_id]
+ROLLUP_QUERY = """
+    SELECT
+        substr(p.data_pedido, 1, 10) AS dia,
+        r.cidade,
+        r.categoria,
+        COALESCE(u.segmento, '') AS segmento,
+        COALESCE(p.status, '') AS status,
+        COUNT(*) AS pedidos,
+        COALESCE(SUM(p.valor_pedido), 0) AS receita,
+        COALESCE(SUM(p.tempo_entrega), 0) AS tempo_entrega_soma,
+        COALESCE(SUM(p.avaliacao), 0) AS avaliacao_soma,
+        COUNT(p.avaliacao) AS avaliacao_qtd
+    FROM pedidos p
+    JOIN restaurantes r ON p.restaurante_id = r.id
+    JOIN usuarios u ON p.usuario_id = u.id
+    WHERE p.id > ? AND p.id <= ?
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+# Dimensões de rollup_sketch e ids dos pedidos com id no intervalo (marca d'água, max_id]
+SKETCH_QUERY = """
+    SELECT
+        substr(p.data_pedido, 1, 10) AS dia,
+        r.cidade,
+        r.categoria,
+        COALESCE(u.segmento, '') AS segmento,
+        COALESCE(p.status = 'Entregue', 0) AS entregue,
+        p.usuario_id,
+        p.restaurante_id
+    FROM pedidos p
+    JOIN restaurantes r ON p.restaurante_id = r.id
+    JOIN usuarios u ON p.usuario_id = u.id
+    WHERE p.id > ? AND p.id <= ?
+"""
+
+def refresh_rollups(conn):
+    """Agrega os pedidos novos (id acima da marca d'água) no rollup diário; devolve os pedidos processados"""
+    ensure_rollup_tables(conn)
+    watermark = rollup_watermark(conn)
+    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_orders_table(conn)}").fetchone()[0]
+
+    # Pedidos recriados com menos linhas que a marca d'água: reconstrói do zero
+    if watermark > max_id:
+        conn.execute('DELETE FROM rollup_diario')
+        watermark = 0
+    if watermark == max_id:
+        return 0
+
+    conn.execute(f'''
+        INSERT INTO rollup_diario
+        {ROLLUP_QUERY}
+        ON CONFLICT (dia, cidade, categoria, segmento, status) DO UPDATE SET
+            pedidos = pedidos + excluded.pedidos,
+            receita = receita + excluded.receita,
+            tempo_entrega_soma = tempo_entrega_soma + excluded.tempo_entrega_soma,
+            avaliacao_soma = avaliacao_soma + excluded.avaliacao_soma,
+            avaliacao_qtd = avaliacao_qtd + excluded.avaliacao_qtd
+    ''', (watermark, max_id))
+    conn.execute("INSERT OR REPLACE INTO rollup_estado (chave, valor) VALUES ('ultimo_pedido_id', ?)", (max_id,))
+    conn.commit()
+    return max_id - watermark
+
+def _decode_sketches(frame, column):
+    """Pares (grupo, registrador, valor) de uma coluna de sketches, grupo = posição da linha em frame"""
+    blobs = frame[column].tolist()
+    index, value = hll.decode(b''.join(blobs))
+    groups = np.repeat(np.arange(len(blobs)), [len(blob) // 4 for blob in blobs])
+    return groups, index, value
+
+def refresh_sketches(conn, chunk_size=1_000_000):
+    """Acrescenta os pedidos novos aos sketches HLL de rollup_sketch; devolve os pedidos processados.
+
+    Os pares (registrador, valor) de cada bloco de pedidos são reduzidos por grupo e unidos
+    aos sketches já gravados dos mesmos grupos; o máximo por registrador é a união.
+    """
+    ensure_rollup_tables(conn)
+    watermark = rollup_watermark(conn, 'ultimo_pedido_id_sketch')
+    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {_orders_table(conn)}").fetchone()[0]
+
+    if watermark > max_id:
+        conn.execute('DELETE FROM rollup_sketch')
+        watermark = 0
+    if watermark == max_id:
+        return 0
+
+    parts = [_order_sketch_pairs(chunk)
+             for chunk in pd.read_sql(SKETCH_QUERY, conn, params=(watermark, max_id), chunksize=chunk_size)]
+
+    # Sketches já gravados dos dias tocados entram na união
+    new_days = pd.concat([dimensions['dia'] for dimensions, _ in parts])
+    existing = pd.read_sql('SELECT * FROM rollup_sketch WHERE dia BETWEEN ? AND ?', conn,
+                           params=(new_days.min(), new_days.max()))
+    if len(existing):
+        parts.append(_stored_sketch_pairs(existing))
+    merged = _combine_sketch_pairs(parts)
+
+    conn.executemany(
+        'INSERT OR REPLACE INTO rollup_sketch VALUES (?, ?, ?, ?, ?, ?, ?)',
+        zip(*(merged[column].tolist() for column in SKETCH_COLUMNS))
+    )
+    conn.execute("INSERT OR REPLACE INTO rollup_estado (chave, valor) VALUES ('ultimo_pedido_id_sketch', ?)", (max_id,))
+    conn.commit()
+    return max_id - watermark
+
+def merge_sketches(sketches, orders):
+    """Une pedidos (linhas de SKETCH_QUERY) às linhas de sketches no formato de rollup_sketch.
+
+    Só os grupos dos dias tocados pelos pedidos são decodificados e regravados; o resto é mantido.
+    """
+    if len(orders) == 0:
+        return sketches
+    if len(sketches) == 0:
+        return _combine_sketch_pairs([_order_sketch_pairs(orders)])
+    touched = sketches['dia'].between(orders['dia'].min(), orders['dia'].max())
+    parts = [_order_sketch_pairs(orders)]
+    if touched.any():
+        parts.append(_stored_sketch_pairs(sketches[touched].reset_index(drop=True)))
+    return pd.concat([sketches[~touched], _combine_sketch_pairs(parts)], ignore_index=True)
+
+def _order_sketch_pairs(orders):
+    """Pares reduzidos por grupo de um bloco de pedidos (dimensões + usuario_id e restaurante_id)"""
+    rows = np.arange(len(orders))
+    return _reduce_sketch_pairs(orders[SKETCH_DIMENSIONS], {
+        column: (rows, *hll.registers_of(orders[id_column].to_numpy()))
+        for column, id_column in (('usuarios', 'usuario_id'), ('restaurantes', 'restaurante_id'))
+    })
+
+def _stored_sketch_pairs(sketches):
+    """Pares reduzidos por grupo de linhas já no formato de rollup_sketch"""
+    return _reduce_sketch_pairs(sketches[SKETCH_DIMENSIONS], {
+        column: _decode_sketches(sketches, column) for column in ('usuarios', 'restaurantes')
+    })
+
+def _combine_sketch_pairs(parts):
+    """Une partes reduzidas em linhas no formato de rollup_sketch (um sketch por grupo e coluna)"""
+    # Grupos das partes numerados em comum; uma nova redução une os pares do mesmo grupo
+    codes, uniques = _factorize_rows(pd.concat([d for d, _ in parts], ignore_index=True))
+    offsets = np.cumsum([0] + [len(d) for d, _ in parts])
+    for column in ('usuarios', 'restaurantes'):
+        groups = np.concatenate([codes[offset + pairs[column][0]] for offset, (_, pairs) in zip(offsets, parts)])
+        index = np.concatenate([pairs[column][1] for _, pairs in parts])
+        value = np.concatenate([pairs[column][2] for _, pairs in parts])
+        groups, index, value = hll.reduce_pairs(groups, index, value)
+        # Pares ordenados por grupo: cada sketch é uma fatia contígua dos bytes codificados
+        packed = hll.encode(index, value)
+        bounds = np.searchsorted(groups, np.arange(len(uniques) + 1)) * 4
+        uniques[column] = [packed[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return uniques
+
+def _factorize_rows(frame):
+    """Código de cada linha (ordem de primeira aparição) e as linhas distintas de frame"""
+    codes = frame.groupby(list(frame.columns), sort=False).ngroup().to_numpy()
+    return codes, frame.drop_duplicates(ignore_index=True)
+
+def _reduce_sketch_pairs(dimensions, registers):
+    """Reduz pares (linha, registrador, valor) ao máximo por grupo de dimensões.
+
+    Devolve os grupos únicos e, por coluna, os pares (posição do grupo, registrador, valor) sem repetição.
+    """
+    codes, uniques = _factorize_rows(dimensions)
+    return uniques, {
+        column: hll.reduce_pairs(codes[rows], index, value) for column, (rows, index, value) in registers.items()
+    }
+
+def _rollup_where(filters):
+    """WHERE parametrizado dos rollups para os filtros de período, cidade e categoria"""
+    conditions, params = [], []
+    if filters.get('data_inicio') is not None:
+        conditions.append('dia >= ?')
+        params.append(pd.Timestamp(filters['data_inicio']).date().isoformat())
+    if filters.get('data_fim') is not None:
+        conditions.append('dia <= ?')
+        params.append(pd.Timestamp(filters['data_fim']).date().isoformat())
+    for name in ('cidade', 'categoria'):
+        if filters.get(name) is not None:
+            conditions.append(f'{name} = ?')
+            params.append(filters[name])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+def filter_rollup(frame, filters):
+    """Linhas de um rollup (ou de sketches) em memória que atendem aos filtros, como em load_rollup"""
+    mask = np.ones(len(frame), dtype=bool)
+    if filters.get('data_inicio') is not None:
+        mask &= (frame['dia'] >= pd.Timestamp(filters['data_inicio']).date().isoformat()).to_numpy()
+    if filters.get('data_fim') is not None:
+        mask &= (frame['dia'] <= pd.Timestamp(filters['data_fim']).date().isoformat()).to_numpy()
+    for name in ('cidade', 'categoria'):
+        if filters.get(name) is not None:
+            mask &= (frame[name] == filters[name]).to_numpy()
+    return frame[mask].reset_index(drop=True)
+
+def merge_rollup(rollup, novos):
+    """Soma linhas novas (de ROLLUP_QUERY) a um rollup diário em memória"""
+    if len(novos) == 0:
+        return rollup
+    dimensions = ['dia', 'cidade', 'categoria', 'segmento', 'status']
+    return pd.concat([rollup, novos], ignore_index=True).groupby(dimensions, as_index=False, sort=False).sum()
+
+def load_rollup(conn, filters):
+    """Linhas do rollup que atendem aos filtros de período, cidade e categoria.
+
+    Durante uma carga (--append), os pedidos acima da marca d'água são agregados na hora e
+    somados, como no modo ao vivo: o dashboard não volta a ler todos os pedidos.
+    """
+    where, params = _rollup_where(filters)
+    with _read_snapshot(conn):
+        rollup = pd.read_sql(f'SELECT * FROM rollup_diario {where}', conn, params=params)
+        watermark, max_id = _tail(conn, 'ultimo_pedido_id')
+        if max_id > watermark:
+            novos = pd.read_sql(ROLLUP_QUERY, conn, params=(watermark, max_id))
+            rollup = merge_rollup(rollup, filter_rollup(novos, filters))
+    return rollup
+
+def _estimate_per_group(frame, column, labels):
+    """Cardinalidade HLL da união dos sketches de column por valor de labels"""
+    codes, uniques = pd.factorize(labels)
+    rows, index, value = _decode_sketches(frame, column)
+    return uniques, hll.estimate(hll.merge(codes[rows], index, value, max(len(uniques), 1)))[:len(uniques)]
+
+def load_sketch_distinct(conn, filters):
+    """Contagens distintas aproximadas (HLL) da seleção, no formato de distinct_from_orders"""
+    where, params = _rollup_where(filters)
+    with _read_snapshot(conn):
+        sketches = pd.read_sql(f'SELECT * FROM rollup_sketch {where}', conn, params=params)
+        # Pedidos acima da marca d'água (carga em andamento) são unidos aos sketches, como em load_rollup
+        watermark, max_id = _tail(conn, 'ultimo_pedido_id_sketch')
+        if max_id > watermark:
+            sketches = merge_sketches(sketches, filter_rollup(
+                pd.read_sql(SKETCH_QUERY, conn, params=(watermark, max_id)), filters
+            ))
+    return distinct_from_sketches(sketches)
+
+def distinct_from_sketches(sketches):
+    """Contagens distintas aproximadas da união de linhas no formato de rollup_sketch"""
+    entregues = sketches[sketches['entregue'] == 1].reset_index(drop=True)
+    todos = np.zeros(len(sketches), dtype=np.int64)
+
+    _, restaurantes = _estimate_per_group(sketches, 'restaurantes', todos)
+    _, usuarios = _estimate_per_group(sketches, 'usuarios', todos)
+    cidades, restaurantes_cidade = _estimate_per_group(entregues, 'restaurantes', entregues['cidade'])
+    _, usuarios_cidade = _estimate_per_group(entregues, 'usuarios', entregues['cidade'])
+    segmentos, usuarios_segmento = _estimate_per_group(entregues, 'usuarios', entregues['segmento'])
+    return {
+        'restaurantes_ativos': int(restaurantes.sum()),
+        'usuarios_ativos': int(usuarios.sum()),
+        'cidade': pd.DataFrame({'cidade': cidades, 'Restaurantes': restaurantes_cidade, 'Usuários': usuarios_cidade}),
+        'segmento': pd.DataFrame({'usuario_segmento': segmentos, 'Total Usuários': usuarios_segmento})
+    }
+
+def _dimension_codes(column):
+    """Códigos inteiros (0 = nulo) e rótulos de uma coluna de texto, usando os códigos do Categorical se houver"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, uniques = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, uniques = pd.factorize(column)
+    return codes.astype(np.int64) + 1, np.concatenate([[''], np.asarray(uniques, dtype=object)])
+
+def _month_codes(data_pedido, month_starts=None):
+    """Índice do mês de cada pedido (0 = primeiro mês da seleção) e rótulos 'AAAA-MM'.
+
+    Com pedidos ordenados por data, month_starts = (rótulos, posição onde cada mês começa)
+    basta para gerar os códigos, sem olhar as datas.
+    """
+    if month_starts is not None:
+        meses, inicio = month_starts
+        pedidos_por_mes = np.diff(np.append(inicio, len(data_pedido)))
+        return np.repeat(np.arange(len(meses), dtype=np.int64), pedidos_por_mes), np.asarray(meses)
+
+    # Converter cada linha para datetime64[M] é lento; dias são uma divisão inteira e o
+    # mês de cada dia vem de uma tabela com poucas centenas de entradas
+    dias = data_pedido.to_numpy().astype('datetime64[D]').astype(np.int64)
+    primeiro_dia = dias.min()
+    meses_por_dia = np.arange(primeiro_dia, dias.max() + 1).astype('datetime64[D]').astype('datetime64[M]')
+    meses = np.arange(meses_por_dia[0], meses_por_dia[-1] + 1)
+    return (meses_por_dia - meses[0]).astype(np.int64)[dias - primeiro_dia], np.datetime_as_string(meses, unit='M')
+
+def rollup_from_orders(df, month_starts=None):
+    """Rollup mensal de um DataFrame de pedidos, com as mesmas colunas de rollup_diario.
+
+    Cada pedido recebe um código único de (mês, cidade, categoria, segmento, status) e todas
+    as somas saem de np.bincount sobre esse código: uma passada por métrica, sem groupby.
+    """
+    columns = ['dia', 'cidade', 'categoria', 'segmento', 'status']
+    if len(df) == 0:
+        return pd.DataFrame(columns=columns + ['pedidos', 'receita', 'tempo_entrega_soma',
+                                               'avaliacao_soma', 'avaliacao_qtd'])
+
+    dimensions = [_month_codes(df['data_pedido'], month_starts)] + [
+        _dimension_codes(df[column]) for column in ('cidade', 'categoria', 'usuario_segmento', 'status')
+    ]
+    key = np.zeros(len(df), dtype=np.int64)
+    for codes, labels in dimensions:
+        key = key * len(labels) + codes
+    size = int(np.prod([len(labels) for _, labels in dimensions]))
+
+    pedidos = np.bincount(key, minlength=size)
+    present = np.flatnonzero(pedidos)
+
+    def soma(values):
+        return np.bincount(key, weights=values, minlength=size)[present]
+
+    avaliacao = df['avaliacao'].to_numpy(dtype=np.float64, na_value=np.nan)
+    avaliada = ~np.isnan(avaliacao)
+    positions = np.unravel_index(present, [len(labels) for _, labels in dimensions])
+    return pd.DataFrame({
+        **{name: labels[position] for name, (_, labels), position in zip(columns, dimensions, positions)},
+        'pedidos': pedidos[present],
+        'receita': soma(df['valor_pedido'].to_numpy(dtype=np.float64)),
+        'tempo_entrega_soma': soma(df['tempo_entrega'].to_numpy(dtype=np.float64, na_value=0)),
+        'avaliacao_soma': soma(np.where(avaliada, avaliacao, 0)),
+        'avaliacao_qtd': np.bincount(key[avaliada], minlength=size)[present]
+    })
+
+def _distinct_per_group(column, ids):
+    """Quantidade de ids distintos por valor de column, via pd.unique sobre a chave (grupo, id)"""
+    codes, labels = _dimension_codes(column)
+    ids = ids.to_numpy().astype(np.int64)
+    width = int(ids.max()) + 1 if len(ids) else 1
+    pairs = pd.unique(codes * width + ids)
+    counts = np.bincount(pairs // width, minlength=len(labels))
+    present = np.flatnonzero(counts)
+    return labels[present], counts[present]
+
+def distinct_from_orders(df):
+    """Contagens distintas de aggregates_from_rollup calculadas sobre o DataFrame de pedidos"""
+    entregues = df[(df['status'] == 'Entregue').to_numpy()]
+    cidades, restaurantes = _distinct_per_group(entregues['cidade'], entregues['restaurante_id'])
+    _, usuarios = _distinct_per_group(entregues['cidade'], entregues['usuario_id'])
+    segmentos, usuarios_segmento = _distinct_per_group(entregues['usuario_segmento'], entregues['usuario_id'])
+    return {
+        'restaurantes_ativos': len(pd.unique(df['restaurante_id'].to_numpy())),
+        'usuarios_ativos': len(pd.unique(df['usuario_id'].to_numpy())),
+        'cidade': pd.DataFrame({'cidade': cidades, 'Restaurantes': restaurantes, 'Usuários': usuarios}),
+        'segmento': pd.DataFrame({'usuario_segmento': segmentos, 'Total Usuários': usuarios_segmento})
+    }
+
+def daily_from_orders(df):
+    """Receita e pedidos entregues por dia (dia, valor_pedido, id) de um DataFrame de pedidos, via np.bincount"""
+    entregue = (df['status'] == 'Entregue').to_numpy()
+    dias = df['data_pedido'].to_numpy()[entregue].astype('datetime64[D]')
+    if len(dias) == 0:
+        return pd.DataFrame({'dia': pd.Series(dtype=object), 'valor_pedido': pd.Series(dtype=float),
+                             'id': pd.Series(dtype=np.int64)})
+
+    primeiro = dias.min()
+    codes = (dias - primeiro).astype(np.int64)
+    pedidos = np.bincount(codes)
+    receita = np.bincount(codes, weights=df['valor_pedido'].to_numpy(dtype=np.float64)[entregue])
+    present = np.flatnonzero(pedidos)
+    return pd.DataFrame({
+        'dia': np.datetime_as_string(primeiro + present, unit='D'),
+        'valor_pedido': receita[present],
+        'id': pedidos[present]
+    })
+
+def aggregates_from_rollup(rollup, distinct, diario=None):
+    """Tabelas de KPIs e gráficos a partir das linhas do rollup.
+
+    distinct traz as contagens distintas (que não podem ser somadas entre linhas):
+    'restaurantes_ativos', 'usuarios_ativos' e os DataFrames 'cidade' (cidade, Restaurantes,
+    Usuários) e 'segmento' (usuario_segmento, Total Usuários) dos pedidos entregues. Sem
+    'cidade' ou 'segmento', as tabelas correspondentes saem sem as colunas de distintos, para
+    serem completadas depois com with_city_distinct e with_segment_distinct.
+    diario é a série diária dos pedidos entregues (dia, valor_pedido, id); se omitida, sai do
+    próprio rollup, que então precisa ter grão diário como rollup_diario.
+    """
+    entregues = rollup[rollup['status'] == 'Entregue']
+    total_pedidos = int(rollup['pedidos'].sum())
+    total_entregues = int(entregues['pedidos'].sum())
+    cancelados = int(rollup.loc[rollup['status'] == 'Cancelado', 'pedidos'].sum())
+    avaliacoes = entregues['avaliacao_qtd'].sum()
+
+    kpis = {
+        'total_pedidos': total_pedidos,
+        'total_receita': entregues['receita'].sum() if total_entregues > 0 else 0,
+        'ticket_medio': entregues['receita'].sum() / total_entregues if total_entregues > 0 else 0,
+        'tempo_medio_entrega': entregues['tempo_entrega_soma'].sum() / total_entregues if total_entregues > 0 else 0,
+        'taxa_cancelamento': (cancelados / total_pedidos * 100) if total_pedidos > 0 else 0,
+        'rating_medio': entregues['avaliacao_soma'].sum() / avaliacoes if avaliacoes > 0 else 0,
+        'restaurantes_ativos': distinct['restaurantes_ativos'] if total_pedidos > 0 else 0,
+        'usuarios_ativos': distinct['usuarios_ativos'] if total_pedidos > 0 else 0
+    }
+
+    # Receita e volume diários (o gráfico reagrupa por semana ou mês)
+    if diario is None:
+        diario = entregues.groupby('dia').agg(valor_pedido=('receita', 'sum'), id=('pedidos', 'sum')).reset_index()
+    diario = diario.sort_values('dia', ignore_index=True)
+
+    # Performance por categoria
+    por_categoria = entregues.groupby('categoria', observed=True).agg(
+        receita=('receita', 'sum'),
+        pedidos=('pedidos', 'sum'),
+        tempo=('tempo_entrega_soma', 'sum'),
+        avaliacao_soma=('avaliacao_soma', 'sum'),
+        avaliacao_qtd=('avaliacao_qtd', 'sum')
+    )
+    categoria = pd.DataFrame({
+        'Receita Total': por_categoria['receita'],
+        'Ticket Médio': por_categoria['receita'] / por_categoria['pedidos'],
+        'Total Pedidos': por_categoria['pedidos'],
+        'Tempo Médio': por_categoria['tempo'] / por_categoria['pedidos'],
+        'Rating Médio': por_categoria['avaliacao_soma'] / por_categoria['avaliacao_qtd'].where(por_categoria['avaliacao_qtd'] > 0)
+    }).round(2).reset_index()
+
+    # Performance por cidade
+    cidade = entregues.groupby('cidade', observed=True).agg(Receita=('receita', 'sum'), Pedidos=('pedidos', 'sum'))
+    cidade = cidade.reset_index()
+    if distinct.get('cidade') is not None:
+        cidade = with_city_distinct(cidade, distinct['cidade'])
+
+    # Segmentação de usuários
+    por_segmento = entregues.groupby('segmento', observed=True).agg(receita=('receita', 'sum'), pedidos=('pedidos', 'sum'))
+    por_segmento.index.name = 'usuario_segmento'
+    segmento = pd.DataFrame({
+        'Receita Total': por_segmento['receita'],
+        'Ticket Médio': por_segmento['receita'] / por_segmento['pedidos'],
+        'Total Pedidos': por_segmento['pedidos']
+    }).reset_index()
+    if distinct.get('segmento') is not None:
+        segmento = with_segment_distinct(segmento, distinct['segmento'])
+
+    return {
+        'kpis': kpis,
+        'diario': diario,
+        'categoria': categoria,
+        'cidade': cidade,
+        'segmento': segmento
+    }
+
+def with_city_distinct(cidade, distinct_cidade):
+    """Completa a tabela por cidade (cidade, Receita, Pedidos) com restaurantes e usuários distintos"""
+    cidade = cidade.set_index('cidade').join(distinct_cidade.set_index('cidade')[['Restaurantes', 'Usuários']]).round(2)
+    cidade['Pedidos por Restaurante'] = cidade['Pedidos'] / cidade['Restaurantes']
+    return cidade.reset_index()
+
+def with_segment_distinct(segmento, distinct_segmento):
+    """Completa a tabela por segmento com o total de usuários distintos"""
+    segmento = segmento.set_index('usuario_segmento').join(
+        distinct_segmento.set_index('usuario_segmento')['Total Usuários']
+    ).round(2)
+    segmento['Pedidos por Usuário'] = segmento['Total Pedidos'] / segmento['Total Usuários']
+    return segmento.reset_index()
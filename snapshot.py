@@ -0,0 +1,220 @@
+"""
+Snapshot colunar (Parquet) da base do iFood para o dashboard e os relatórios.
+
+A exportação grava a tabela fato de pedidos já desnormalizada (join com restaurantes e
+usuários), particionada por mês no layout hive (pedidos/mes=AAAA-MM/), e um arquivo
+Parquet por dimensão. Os leitores carregam só as colunas e os meses necessários, com
+os arquivos mapeados em memória; textos repetidos voltam como Categorical.
+
+O snapshot guarda a versão dos dados de origem: geração da base e maiores ids de
+pedidos, restaurantes e usuários (os ids só crescem, então não é preciso contar linhas).
+A geração muda sempre que o gerador recria as tabelas, mesmo com os mesmos tamanhos; se
+a base mudou depois da exportação, os leitores voltam a consultar o SQLite.
+
+Uso:
+    python snapshot.py --db ifood_data.db
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+MANIFEST = '_snapshot.json'
+
+# Tabela fato: pedidos com os atributos de restaurante e usuário usados pelo dashboard e relatórios
+FACT_QUERY = """
+SELECT
+    p.*,
+    r.nome as restaurante_nome,
+    r.categoria,
+    r.cidade,
+    r.rating as restaurante_rating,
+    u.segmento as usuario_segmento,
+    u.cidade as usuario_cidade
+FROM pedidos p
+JOIN restaurantes r ON p.restaurante_id = r.id
+JOIN usuarios u ON p.usuario_id = u.id
+"""
+
+DIMENSIONS = ('restaurantes', 'usuarios', 'entregadores')
+
+# Colunas de texto com poucos valores distintos, gravadas com dicionário
+DICTIONARY_COLUMNS = ('status', 'categoria', 'cidade', 'usuario_segmento', 'usuario_cidade')
+
+def available():
+    """Verdadeiro se o pyarrow está instalado"""
+    return pa is not None
+
+def default_path(db_path):
+    """Diretório padrão do snapshot: ifood_data.db -> ifood_data_snapshot/"""
+    return f"{os.path.splitext(db_path)[0]}_snapshot"
+
+def data_version(conn):
+    """Versão dos dados de origem: muda quando a base é recriada ou recebe pedidos, restaurantes ou usuários"""
+    orders = 'pedidos_base' if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'pedidos_base'"
+    ).fetchone() else 'pedidos'
+    # MAX(id) lê só a ponta do índice da chave primária; COUNT(*) percorreria a tabela inteira
+    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {orders}").fetchone()[0]
+    restaurantes = conn.execute('SELECT COALESCE(MAX(id), 0) FROM restaurantes').fetchone()[0]
+    usuarios = conn.execute('SELECT COALESCE(MAX(id), 0) FROM usuarios').fetchone()[0]
+    generation = conn.execute('PRAGMA user_version').fetchone()[0]
+    return [generation, max_id, restaurantes, usuarios]
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def is_current(path, conn):
+    """Verdadeiro se o snapshot existe, o pyarrow está disponível e a base não mudou desde a exportação"""
+    if not available():
+        return False
+    manifest = read_manifest(path)
+    return manifest is not None and manifest['versao'] == data_version(conn)
+
+def fact_schema(columns):
+    """Schema Arrow da tabela fato, declarado pelos tipos conhecidos de cada coluna.
+
+    Inferir o schema do primeiro bloco não serve: numa base migrada e depois acrescida,
+    o primeiro bloco pode ter entregador_id só com NULL (tipo null), e os blocos
+    seguintes não convertem para ele. Inteiros que aceitam NULL ficam em double.
+    """
+    dictionary = pa.dictionary(pa.int8(), pa.string())
+    types = {
+        'id': pa.int64(),
+        'restaurante_id': pa.int64(),
+        'usuario_id': pa.int64(),
+        'valor_pedido': pa.float64(),
+        'taxa_entrega': pa.float64(),
+        'tempo_entrega': pa.int64(),
+        'data_pedido': pa.timestamp('ms'),
+        'avaliacao': pa.float64(),
+        'entregador_id': pa.float64(),
+        'restaurante_nome': pa.large_string(),
+        'restaurante_rating': pa.float64(),
+        **{column: dictionary for column in DICTIONARY_COLUMNS}
+    }
+    return pa.schema([pa.field(column, types.get(column, pa.large_string())) for column in columns])
+
+def _to_arrow(df, schema):
+    """Converte um bloco de pedidos para Arrow com datas nativas e textos com dicionário"""
+    df['data_pedido'] = pd.to_datetime(df['data_pedido'], format='ISO8601').astype('datetime64[ms]')
+    for column in DICTIONARY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+def export_snapshot(db_path='ifood_data.db', path=None, chunk_size=500_000):
+    """Exporta pedidos (por mês) e dimensões da base SQLite para Parquet; devolve o diretório"""
+    if not available():
+        raise RuntimeError("pyarrow não instalado. Execute: pip install pyarrow")
+    path = path or default_path(db_path)
+    conn = sqlite3.connect(db_path)
+    version = data_version(conn)
+
+    # Grava em um diretório temporário e troca no final: leitores nunca veem um snapshot pela metade
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, 'pedidos'))
+
+    start = time.perf_counter()
+    writers, schema, rows = {}, None, 0
+    try:
+        for chunk in pd.read_sql(FACT_QUERY, conn, chunksize=chunk_size):
+            if schema is None:
+                schema = fact_schema(chunk.columns)
+            table = _to_arrow(chunk, schema)
+            months = pd.Series(chunk['data_pedido'].dt.strftime('%Y-%m'))
+            for month, positions in months.groupby(months).indices.items():
+                if month not in writers:
+                    month_dir = os.path.join(staging, 'pedidos', f"mes={month}")
+                    os.makedirs(month_dir)
+                    writers[month] = pq.ParquetWriter(os.path.join(month_dir, 'part-0.parquet'), schema)
+                writers[month].write_table(table.take(positions))
+            rows += len(chunk)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    for name in DIMENSIONS:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone():
+            dimension = pd.read_sql(f"SELECT * FROM {name}", conn)
+            pq.write_table(pa.Table.from_pandas(dimension, preserve_index=False), os.path.join(staging, f"{name}.parquet"))
+    conn.close()
+
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({
+            'versao': version,
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'pedidos': rows,
+            'meses': sorted(writers)
+        }, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    print(f"✅ Snapshot gravado em {path}: {rows:,} pedidos em {len(writers)} meses "
+          f"({time.perf_counter() - start:.1f}s)")
+    return path
+
+def load_orders(path, columns=None, filters=None):
+    """Pedidos do snapshot, lendo só as colunas pedidas e os meses do período.
+
+    filters aceita as chaves do dashboard: data_inicio, data_fim (inclusive), cidade e categoria.
+    """
+    filters = filters or {}
+    dataset = ds.dataset(
+        os.path.join(path, 'pedidos'),
+        format='parquet',
+        partitioning='hive',
+        filesystem=pafs.LocalFileSystem(use_mmap=True)
+    )
+
+    # Filtros no mês (partição) descartam arquivos inteiros; os demais usam as estatísticas dos row groups
+    expression = None
+    conditions = []
+    if filters.get('data_inicio') is not None:
+        inicio = pd.Timestamp(filters['data_inicio']).normalize()
+        conditions += [ds.field('mes') >= inicio.strftime('%Y-%m'), ds.field('data_pedido') >= inicio]
+    if filters.get('data_fim') is not None:
+        fim = pd.Timestamp(filters['data_fim']).normalize() + pd.Timedelta(days=1)
+        conditions += [ds.field('mes') <= pd.Timestamp(filters['data_fim']).strftime('%Y-%m'), ds.field('data_pedido') < fim]
+    for name in ('cidade', 'categoria'):
+        if filters.get(name) is not None:
+            conditions.append(ds.field(name) == filters[name])
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    # A coluna de partição (mes) só serve para podar arquivos
+    columns = columns or [name for name in dataset.schema.names if name != 'mes']
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+def load_dimension(path, name, columns=None):
+    """Uma dimensão do snapshot (restaurantes, usuarios ou entregadores)"""
+    return pq.read_table(os.path.join(path, f"{name}.parquet"), columns=columns, memory_map=True).to_pandas()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exporta a base do iFood para um snapshot Parquet")
+    parser.add_argument('--db', default='ifood_data.db', help="Caminho do banco SQLite")
+    parser.add_argument('--out', default=None, help="Diretório do snapshot (padrão: <base>_snapshot)")
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="Pedidos lidos do SQLite por bloco")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    export_snapshot(args.db, args.out, args.chunk_size)